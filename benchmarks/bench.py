@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Times the scripts stage by stage (parse, aggregate, render) on
+synthetic clocks (see gen_clocks.py) and records the peak memory allocated
+per stage. The results are saved as json, compare them with the ones of
+another version with --compare.
+"""
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('-y', '--years', type=float, nargs='+', default=[1, 5],
+                    help="""Sizes of the synthetic exports in years.
+                    Default: 1 5.""")
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help="""Runs per stage, the fastest one is reported.
+                    Default: 3.""")
+parser.add_argument('-o', '--output', type=str,
+                    help="""Save the results to a json file.""")
+parser.add_argument('-c', '--compare', type=str,
+                    help="""Results (json) of a previous run to compare
+                    with.""")
+
+
+#
+# measure
+#
+
+class Stages:
+    """Collects wall time and peak memory of named stages (fastest run)."""
+
+    def __init__(self, repeat=1):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, fn, *args):
+        """Runs fn(*args) repeat times, returns the result of the last run."""
+        for _ in range(self.repeat):
+            stages = instrument.Stages(enabled=True)
+            with contextlib.redirect_stdout(io.StringIO()), \
+                 contextlib.redirect_stderr(io.StringIO()), \
+                 stages.stage(name):
+                res = fn(*args)
+            r = stages.results[name]
+            if name not in self.results or \
+               r['time'] < self.results[name]['time']:
+                self.results[name] = r
+        return res
+
+
+def startup(args):
+    """Wall time of a fresh process running the timesheet CLI."""
+    cmd = [sys.executable, os.path.join(SCRIPTS, "timesheet.py")] + args
+    best = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    return best
+
+
+#
+# benchmarks
+#
+
+def bench_org2csv(stages, data, month, tmp):
+    import org2csv
+    import orgclock
+    loaded = stages.run('load', orgclock.load, data)
+    clocks = stages.run('parse', org2csv.read, loaded, month)
+    days = stages.run('aggregate', org2csv.reduce_days, clocks)
+    stages.run('stream', org2csv.stream, [data], month)
+    stages.run('timesheet', org2csv.timesheet, days, month, "IoT4CPS")
+    stages.run('render', org2csv.csv_efforts, days, month, "IoT4CPS")
+    timesheet = os.path.join(tmp, "{:%Y-%m}.csv".format(month))
+    with open(timesheet, 'w') as f:
+        f.write(org2csv.csv_efforts(days, month, "IoT4CPS"))
+    return len(clocks['start']), timesheet
+
+def bench_csv_check(stages, timesheet):
+    import csv_check
+    project, data = stages.run('parse', csv_check.read, timesheet)
+    stages.run('render', csv_check.check, project, data)
+    return len(data)
+
+def bench_csv2tex(stages, timesheet):
+    import csv2tex
+    data = stages.run('load', csv2tex.read, timesheet)
+    stages.run('render', csv2tex.tex_efforts, data, {})
+    return len(data['rows'])
+
+def bench_plot_heatmap(stages, data, tmp):
+    import orgclock
+    import heatmap
+    loaded = stages.run('load', orgclock.load, data)
+    clocks = stages.run('parse', orgclock.parse, loaded)
+    x, bins, dt0, dt1 = stages.run('aggregate', heatmap.efforts,
+                                   clocks['start'], clocks['hours'])
+    xticks, xlabels = heatmap.month_ticks(dt0, dt1)
+    stages.run('render_native', heatmap.export,
+               os.path.join(tmp, "heatmap.svg"), x, bins, xticks, xlabels)
+    def render():
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(10, 2))
+        heatmap.plot(fig, x, bins, xticks, xlabels)
+        fig.savefig(os.path.join(tmp, "heatmap.png"))
+        plt.close(fig)
+    stages.run('render', render)
+    return len(clocks['start'])
+
+def bench_plot_hours_per_h1(stages, data, tmp):
+    import orgclock
+    import efforts
+    loaded = stages.run('load', orgclock.load, data)
+    clocks = stages.run('parse', orgclock.parse, loaded)
+    projects = efforts.projects(clocks)
+    bins = stages.run('aggregate', efforts.efforts, clocks, projects, 'm')
+    def render():
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(10, 12))
+        efforts.plot(fig, bins, projects, 'm',
+                     clocks['start'][0].astype(datetime))
+        fig.savefig(os.path.join(tmp, "h1.png"))
+        plt.close(fig)
+    stages.run('render', render)
+    return len(clocks['start'])
+
+def run(years, repeat):
+    """Benchmarks all scripts on a synthetic export of the given years."""
+    import gen_clocks
+    import matplotlib
+    matplotlib.use('Agg')
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, "clocks.csv")
+        gen_clocks.main(["-y", str(years), "-o", data])
+        # last month with absences (all columns of the timesheet in use)
+        with open(data, 'r') as f:
+            month = max(l.split(',')[3][:7] for l in f
+                        if l.startswith(tuple(gen_clocks.ABSENCES)))
+        month = datetime.strptime(month, "%Y-%m")
+
+        stages = Stages(repeat)
+        rows, timesheet = bench_org2csv(stages, data, month, tmp)
+        results['org2csv'] = dict(stages.results, rows=rows)
+        for name, bench, bench_args in [
+                ('csv_check', bench_csv_check, (timesheet,)),
+                ('csv2tex', bench_csv2tex, (timesheet,)),
+                ('plot_heatmap', bench_plot_heatmap, (data, tmp)),
+                ('plot_hours_per_h1', bench_plot_hours_per_h1, (data, tmp))]:
+            stages = Stages(repeat)
+            rows = bench(stages, *bench_args)
+            results[name] = dict(stages.results, rows=rows)
+    return results
+
+
+#
+# output
+#
+
+def print_results(results, previous=None):
+    print("{:24} {:14} {:>10} {:>10} {:>8}".format(
+        "benchmark", "stage", "time [ms]", "peak [kB]", "change"))
+    for size, scripts in results['benchmarks'].items():
+        for script, stages in scripts.items():
+            for stage, r in stages.items():
+                if stage == 'rows':
+                    continue
+                change = ""
+                try:
+                    old = previous['benchmarks'][size][script][stage]
+                    change = "{:+.0%}".format(r['time'] / old['time'] - 1)
+                except (KeyError, TypeError, ZeroDivisionError):
+                    pass
+                print("{:24} {:14} {:10.1f} {:10.0f} {:>8}".format(
+                    "{} ({})".format(script, size), stage, r['time']*1000,
+                    r['peak']/1024, change))
+    for cmd, t in results['startup'].items():
+        change = ""
+        try:
+            change = "{:+.0%}".format(t / previous['startup'][cmd] - 1)
+        except (KeyError, TypeError, ZeroDivisionError):
+            pass
+        print("{:24} {:14} {:10.1f} {:>10} {:>8}".format(
+            "startup", cmd, t*1000, "", change))
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    results = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'benchmarks': {},
+        'startup': {
+            'help': startup(["-h"]),
+            'convert -h': startup(["convert", "-h"]),
+        },
+    }
+    for years in args.years:
+        results['benchmarks']["{:g}y".format(years)] = run(years, args.repeat)
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
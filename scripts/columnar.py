@@ -0,0 +1,148 @@
+"""Columnar files (Parquet, Arrow) of parsed clocks and daily aggregates.
+
+Written by export_columnar.py, read by the plot scripts (via orgclock.read())
+and by notebooks, e.g., pandas.read_parquet('clocks.parquet'). Text columns
+are dictionary encoded (categorical). Arrow files are memory-mapped, i.e., the
+numeric columns are read without copying.
+
+Requires pyarrow (imported when reading or writing).
+"""
+
+import os
+
+import numpy as np
+
+import orgclock
+
+
+#
+# config
+#
+
+FORMATS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
+CATEGORICAL = ['h1', 'parents', 'task']
+
+
+def is_columnar(filename):
+    return os.path.splitext(filename)[1] in FORMATS
+
+def pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("columnar files require pyarrow "
+                         "(pip install pyarrow)")
+    return pyarrow
+
+
+#
+# tables
+#
+
+def categorical(pa, column):
+    """Dictionary encoded string column from a bytes array."""
+    categories, codes = np.unique(column, return_inverse=True)
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes.astype(np.int32)),
+        pa.array([c.decode(orgclock.enc) for c in categories],
+                 type=pa.string()))
+
+def clocks_table(clocks):
+    """Table of the clock entries (parsed clocks, see orgclock.parse())."""
+    pa = pyarrow()
+    wp, wp_task = orgclock.work_packages(clocks)
+    return pa.table({
+        'start': pa.array(clocks['start'].astype('datetime64[s]'),
+                          type=pa.timestamp('s')),
+        'end': pa.array(clocks['end'].astype('datetime64[s]'),
+                        type=pa.timestamp('s')),
+        'hours': pa.array(clocks['hours']),
+        'h1': categorical(pa, clocks['h1']),
+        'parents': categorical(pa, clocks['parents']),
+        'task': categorical(pa, clocks['task']),
+        'wp': pa.array(wp.astype(np.int8)),
+        'wp_task': pa.array(wp_task.astype(np.int8)),
+    })
+
+def daily_table(clocks):
+    """Table of the hours per day and main headline (h1)."""
+    pa = pyarrow()
+    days = clocks['start'].astype('datetime64[D]')
+    categories, h1 = np.unique(clocks['h1'], return_inverse=True)
+    # sort by day and h1, then sum up the runs of equal keys
+    order = np.lexsort((h1, days))
+    days, h1 = days[order], h1[order]
+    first = np.ones(len(days), dtype=bool)
+    first[1:] = (days[1:] != days[:-1]) | (h1[1:] != h1[:-1])
+    idx = np.flatnonzero(first)
+    hours = np.add.reduceat(clocks['hours'][order], idx) if len(idx) \
+        else np.zeros(0)
+    return pa.table({
+        'day': pa.array(days[idx]),
+        'h1': categorical(pa, categories[h1[idx]]),
+        'hours': pa.array(hours),
+    })
+
+
+#
+# files
+#
+
+def write(table, filename):
+    """Writes a table, the format is given by the file extension."""
+    pa = pyarrow()
+    if FORMATS[os.path.splitext(filename)[1]] == 'parquet':
+        pa.parquet.write_table(table, filename)
+    else:
+        with pa.OSFile(filename, 'wb') as sink, \
+             pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def read_table(filename):
+    pa = pyarrow()
+    if FORMATS[os.path.splitext(filename)[1]] == 'parquet':
+        # read_table() would import pandas for its metadata
+        return pa.parquet.ParquetFile(filename, memory_map=True).read(
+            use_pandas_metadata=False)
+    return pa.ipc.open_file(pa.memory_map(filename, 'r')).read_all()
+
+def values(array, dtype):
+    """Numpy view of the data buffer of an arrow array (without nulls)."""
+    dtype = np.dtype(dtype)
+    return np.frombuffer(array.buffers()[1], dtype=dtype, count=len(array),
+                         offset=array.offset*dtype.itemsize)
+
+def column(table, name, dtype=None):
+    """Column as numpy array, text columns as bytes (like orgclock.load()).
+
+    Numeric columns are views of the table's memory (no copy). Array.to_numpy()
+    is avoided as it imports pandas.
+
+    """
+    pa = pyarrow()
+    col = table.column(name).combine_chunks()
+    if pa.types.is_dictionary(col.type):
+        categories = np.array([c.encode(orgclock.enc)
+                               for c in col.dictionary.to_pylist()],
+                              dtype='S100')
+        return categories[values(col.indices, np.int32)]
+    if pa.types.is_timestamp(col.type):
+        # parquet stores seconds as milliseconds
+        dtype = 'datetime64[{}]'.format(col.type.unit)
+    return values(col, dtype)
+
+def read(filename):
+    """Parsed clocks (see orgclock.parse()) of a columnar clocks file."""
+    table = read_table(filename)
+    clocks = {
+        'start': column(table, 'start'),
+        'end': column(table, 'end'),
+        'hours': column(table, 'hours', np.float64),
+    }
+    clocks['start'] = clocks['start'].astype('datetime64[m]')
+    clocks['end'] = clocks['end'].astype('datetime64[m]')
+    for name in CATEGORICAL:
+        clocks[name] = column(table, name)
+    return clocks
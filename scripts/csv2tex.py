@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 
 import argparse
-import numpy as np
-from datetime import datetime, timedelta
 import string
 import sys
 import os
-import subprocess
-import math
+
+import instrument
+import monthsheet
 
 
 #
@@ -35,30 +34,20 @@ parser.add_argument('-t', '--template', type=argparse.FileType('r'),
                     replaced by the efforts table.""")
 parser.add_argument('-n', '--name', required=True,
                     help="""Your name.""")
-args = parser.parse_args()
+instrument.add_arguments(parser)
 
 
 #
 # read data
 #
 
-enc = 'utf-8'
-
-# load into numpy array
-data = np.genfromtxt(args.data, delimiter=';', dtype=None, names=True,
-                     invalid_raise=False)
-
 # field indices
-field_idx = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+field_idx = tuple(range(len(monthsheet.COLUMNS)))
 DATE, PROJECT, WP, TASK, ACT, PHOURS, OTHER, OHOURS, ABSENCE, AHOURS, TOTAL = field_idx
-assert len(field_idx) == len(data[0]), "column number mismatch"
-
 
-# load template
-template = string.Template(args.template.read())
-
-# setup WP/Task summary
-summary = {}
+def read(filename):
+    """Loads the timesheet from a csv file (see monthsheet.py)."""
+    return monthsheet.read(filename)
 
 
 #
@@ -68,23 +57,19 @@ summary = {}
 
 def check_weekday(row, err="", overhead=0):
     """Appends errors concerning weekday."""
-    if (row[PROJECT] is False or row[PROJECT].decode(enc) == "") \
-       and row[PHOURS] > 0:
+    if row[PROJECT] == "" and row[PHOURS] > 0:
         err += "  [ERROR] missing activity description of project\n"
-    if len(row[PROJECT].decode(enc)) > 50:
+    if len(row[PROJECT]) > 50:
         err += "  [WARN ] description of project too long\n"
-    if (row[WP] is False or row[WP] < 0) and row[PHOURS] > 0:
+    if row[WP] < 0 and row[PHOURS] > 0:
         err += "  [ERROR] missing WP\n"
-    if (row[OTHER] is False or row[OTHER].decode(enc) == "") \
-       and row[OHOURS] > 0:
+    if row[OTHER] == "" and row[OHOURS] > 0:
         err += "  [ERROR] missing other activity\n"
-    if (row[ABSENCE] is False or row[ABSENCE].decode(enc) == "") \
-       and row[AHOURS] > 0:
+    if row[ABSENCE] == "" and row[AHOURS] > 0:
         err += "  [ERROR] missing absence description\n"
     if row[TOTAL] == 0 and row[AHOURS] == 0:
         err += "  [ERROR] missing clocks for this day\n"
-    if not math.isnan(row[PHOURS]) and not math.isnan(row[OHOURS]) and \
-       row[TOTAL] != row[PHOURS] + row[OHOURS]:
+    if row[TOTAL] != row[PHOURS] + row[OHOURS]:
         err += "  [ERROR] total of hours mismatch (total != phours + ohours)\n"
     if row[TOTAL] > 0 and row[TOTAL] < MIN_HOURS_PER_DAY:
         err += "  [ERROR] hours per day below minimum\n"
@@ -94,31 +79,35 @@ def check_weekday(row, err="", overhead=0):
     return err, overhead
 
 def check_weekend(row, err="", overhead=0):
-    """Appends errors concerning weekend."""
+    """Appends errors concerning weekend (and public holidays)."""
     if row[PHOURS] > 0 or row[OHOURS] > 0 or row[AHOURS] > 0:
         overhead += row[TOTAL]
-        err += "  [ERROR] hours on a weekend are not allowed ({:.1f})\n".format(overhead)
+        err += "  [ERROR] hours on a weekend or public holiday are not allowed ({:.1f})\n".format(overhead)
     return err, overhead
 
-def check(row):
+def workday(row):
+    """Whether the date of the row is a working day (see workcal)."""
+    return monthsheet.workday(row)
+
+def check(row, is_workday=None, file=None):
     """Checks row for timesheet requirements.
 
-    Prints warnings. Returns the amount of hours that exceed 10h per day (hours
-    that shall be re-assigned to other days).
+    Prints warnings (to stderr or the given file). Returns the amount of hours
+    that exceed 10h per day (hours that shall be re-assigned to other days).
 
     """
     err = ""
     overhead = 0
-    weekend = True if "Sat" in row[DATE].decode(enc) \
-              or "Sun" in row[DATE].decode(enc) else False
-    if weekend:
+    if is_workday is None:
+        is_workday = workday(row)
+    if not is_workday:
         err, overhead = check_weekend(row)
     else:
         err, overhead = check_weekday(row)
     # print with date info if errors have occured
     if err != "":
-        err = row[DATE].decode(enc) + "\n" + err
-        print(err, file=sys.stderr)
+        err = "{:{}}".format(row[DATE], monthsheet.DATE_FORMAT) + "\n" + err
+        print(err, file=sys.stderr if file is None else file)
     # return the overhead over the maximum allowed hours per day
     return overhead
 
@@ -127,7 +116,7 @@ def check(row):
 # summary
 #
 
-def add_to_summary(row):
+def add_to_summary(summary, row):
     """Collect the number of hours per work package and task."""
     wp = row[WP]
     task = row[TASK]
@@ -141,24 +130,26 @@ def add_to_summary(row):
     # add hours to WP-Task
     summary[wp][task] += hours
 
-def print_summary():
+def print_summary(summary, file=None):
     """Prints hours per WP and task."""
     # sorted print
     wps = sorted(summary.keys())
     for wp in wps:
         tasks = sorted(summary[wp].keys())
-        print("WP{:2}         -> {:4}".format(wp, sum([summary[wp][t] for t in tasks])))
+        print("WP{:2}         -> {:4}".format(wp, sum([summary[wp][t] for t in tasks])),
+              file=file)
         for task in tasks:
             print("WP{:2}, Task{:2} -> {:4}".format(wp, task,
-                                                    summary[wp][task]))
-        print("")
+                                                    summary[wp][task]),
+                  file=file)
+        print("", file=file)
 
 #
 # print
 #
 
-def tex_table_begin():
-    header = list(data.dtype.names)
+def tex_table_begin(header):
+    header = list(header)
     header[PHOURS] = header[OHOURS] = header[AHOURS] = "Hours"
     align = ['l', '|p{70mm}', 'c', 'c', 'c', 'r', '|p{30mm}', 'r', '|p{30mm}',
              'r', '|r']
@@ -184,10 +175,11 @@ def tex_table_row(row):
     res = " & ".join(row) + "\\\\ \hline"
     return res
 
-def tex_table_clock_row(row):
+def tex_table_clock_row(row, is_workday=None):
+    if is_workday is None:
+        is_workday = workday(row)
     row = list(row)
-    weekend = True if "Sat" in row[DATE].decode(enc) \
-              or "Sun" in row[0].decode(enc) else False
+    weekend = not is_workday
     # colors
     rowcolor = ""
     if weekend:
@@ -204,17 +196,15 @@ def tex_table_clock_row(row):
     if not weekend:
         hcellcolor = "\\cellcolor{\\tuwBlue!20!white} "
     # format fields
-    row[DATE] = rowcolor + " " + row[0].decode(enc)
-    row[PROJECT] = row[1].decode(enc)
+    row[DATE] = rowcolor + " " + "{:{}}".format(row[0],
+                                                monthsheet.DATE_FORMAT)
     row[WP] = "{:d}".format(row[2]) if row[2] > 0 else ""
     row[TASK] = "{:d}".format(row[3]) if row[3] > 0 else ""
     row[ACT] = ""
     row[PHOURS] = hcellcolor + ("\\texttt{{{:.1f}}}".format(row[5])
                                 if row[5] > 0 else "")
-    row[OTHER] = row[6].decode(enc)
     row[OHOURS] = hcellcolor + ("\\texttt{{{:.1f}}}".format(row[7])
                                 if row[7] > 0 else "")
-    row[ABSENCE] = row[8].decode(enc)
     row[AHOURS] = hcellcolor + ("\\texttt{{{:.1f}}}".format(row[9])
                                 if row[9] > 0 else "")
     row[TOTAL] = tcellcolor + "\\texttt{{{:.1f}}}".format(row[10]) \
@@ -223,24 +213,28 @@ def tex_table_clock_row(row):
     res = tex_table_row(row)
     return res
 
-def tex_efforts():
+def tex_efforts(data, summary, file=None):
+    """Latex table of a timesheet (see monthsheet.py), collects the hours per
+    WP and task in summary. Warnings are printed to stderr or the given
+    file (see check)."""
     res = ""
-    res += tex_table_begin()
+    res += tex_table_begin(monthsheet.header(data['project']))
     # print efforts in a table
     phours_sum = 0
     ohours_sum = 0
     ahours_sum = 0
     overhead = 0
-    for r in data:
-        phours_sum += r['pHours'] if not math.isnan(r['pHours']) and r['pHours'] > 0 else 0
-        ohours_sum += r['oHours'] if not math.isnan(r['oHours']) and r['oHours'] > 0 else 0
-        ahours_sum += r['aHours'] if not math.isnan(r['aHours']) and r['aHours'] > 0 else 0
+    for r in data['rows']:
+        is_workday = workday(r)
+        phours_sum += r[PHOURS] if r[PHOURS] > 0 else 0
+        ohours_sum += r[OHOURS] if r[OHOURS] > 0 else 0
+        ahours_sum += r[AHOURS] if r[AHOURS] > 0 else 0
         # check row and print warnings if any
-        overhead += check(r)
+        overhead += check(r, is_workday, file)
         # get latex representation
-        res += tex_table_clock_row(r)
+        res += tex_table_clock_row(r, is_workday)
         # save data for summary
-        add_to_summary(r)
+        add_to_summary(summary, r)
     res += "\hline"
     res += tex_table_row(["\\textbf{Summary}", "", "", "", "",
                           "\\bf \\texttt{{{:.1f}}}".format(phours_sum), "",
@@ -250,7 +244,7 @@ def tex_efforts():
     res += tex_table_end()
     if overhead > 0:
         print("\nTotal overhead to distribute: {:.1f}".format(overhead),
-              file=sys.stderr)
+              file=sys.stderr if file is None else file)
     return res
 
 
@@ -258,13 +252,32 @@ def tex_efforts():
 # output
 #
 
-# write tex (temp file)
-with open(args.data.replace(".csv", ".tex"), 'w') as f:
-    s = template.substitute({
-        'name': args.name,
-        'efforts': tex_efforts()
-    })
-    f.write(s)
-    f.close()
-
-print_summary()
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    with stages.stage('load') as s:
+        try:
+            data = read(args.data)
+        except ValueError as e:
+            raise SystemExit("[ERROR] {}".format(e))
+        s['rows'] = len(data['rows'])
+    # load template
+    template = string.Template(args.template.read())
+    # setup WP/Task summary
+    summary = {}
+    with stages.stage('render'):
+        res = template.substitute({
+            'name': args.name,
+            'efforts': tex_efforts(data, summary)
+        })
+    # write tex (temp file)
+    with stages.stage('write'):
+        with open(args.data.replace(".csv", ".tex"), 'w') as f:
+            f.write(res)
+            f.close()
+    print_summary(summary)
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
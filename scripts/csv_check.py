@@ -1,15 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import string
-import sys
-import os
-import subprocess
 import math
 
+import instrument
+import monthsheet
+
 
 #
 # config
@@ -25,94 +21,152 @@ MAX_HOURS_PER_DAY = 10
 
 desc = """Checks the csv timesheet for errors."""
 
-cwd = os.getcwd()
-
 parser = argparse.ArgumentParser(description=desc)
 parser.add_argument('data', type=str,
                     help="""Input, a csv file.""")
-args = parser.parse_args()
+instrument.add_arguments(parser)
 
 
 #
 # read data
 #
 
-data = pd.read_csv(args.data, sep=';')
-
-project = list(data)[1]
-
-# replace NaN by 0.0 to be able to calculate with these values
-data.loc[data['pHours'].isnull(), 'pHours'] = 0.0
-data.loc[data['oHours'].isnull(), 'oHours'] = 0.0
-data.loc[data['aHours'].isnull(), 'aHours'] = 0.0
-
-# add overhead column
-overhead = data['Total'] - MAX_HOURS_PER_DAY
-data.loc[:, 'overhead'] = pd.Series(overhead, index=data.index)
-data.loc[data['overhead'] < 0, 'overhead'] = 0.0
-
-# distinguish work day and weekend when checking
-weekend = data[data['Date'].str.contains("S")]
-work = data[~data['Date'].str.contains("S")]
+def rows(sheet):
+    """Project and a list of rows (dict) of a timesheet (see monthsheet.py).
+
+    Empty hours are 0.0 to be able to calculate with these values, missing
+    descriptions are None and a missing WP or total is NaN.
+
+    """
+    project = sheet['project']
+    names = monthsheet.header(project)
+    data = []
+    for i, values in enumerate(sheet['rows']):
+        row = {k: v if v != "" else None for k, v in zip(names, values)}
+        row['index'] = i
+        row['workday'] = monthsheet.workday(values)
+        row['Date'] = "{:{}}".format(values[monthsheet.DATE],
+                                     monthsheet.DATE_FORMAT)
+        row['WP'] = float(row['WP']) if row['WP'] != -1 else math.nan
+        row['Task'] = row['Task'] if row['Task'] != -1 else None
+        # add overhead column
+        row['overhead'] = 0.0 if math.isnan(row['Total']) \
+            else max(row['Total'] - MAX_HOURS_PER_DAY, 0.0)
+        data.append(row)
+    return project, data
+
+def parse(lines):
+    """Parses the timesheet, returns the project and a list of rows (see
+    rows)."""
+    return rows(monthsheet.parse(lines))
+
+def read(filename):
+    """Reads the timesheet from a csv file (see rows)."""
+    return rows(monthsheet.read(filename))
 
 
 #
 # filter erroneous rows and print
 #
 
-def report_error(data, desc="", columns=None):
+def report_error(data, desc="", columns=None, file=None):
     if len(data) > 0:
-        print("[ERROR] {}:".format(desc))
-        if columns is None:
-            print(data)
-        else:
-            print(data[columns])
-        print()
-
-error_data = weekend[(weekend['pHours'] > 0)
-                     | (weekend['oHours'] > 0)
-                     | (weekend['aHours'] > 0)]
-report_error(error_data, "hours on weekdays",
-             ['Date', 'pHours', 'oHours', 'aHours', 'Total'])
-
-error_data = work[(work['pHours'] > 0) & work[project].isnull()]
-report_error(error_data, "description of project too long",
-             ['Date', project])
-
-error_data = work[work[project].str.len() > 50]
-report_error(error_data, "description of project too long",
-             ['Date', project])
-
-error_data = work[(work['pHours'] > 0) & (work['WP'].isnull() | (work['WP'] < 0))]
-report_error(error_data, "missing WP", ['Date', 'WP'])
-
-error_data = work[(work['oHours'] > 0) & work['Other Activities'].isnull()]
-report_error(error_data, "missing other activities description",
-             ['Date', 'Other Activities', 'oHours'])
-
-error_data = work[(work['aHours'] > 0) & work['Absence'].isnull()]
-report_error(error_data, "missing absence description",
-             ['Date', 'Absence', 'aHours'])
-
-error_data = work[(work['Total'] <= 0) & (work['aHours'] <= 0)]
-report_error(error_data, "missing hours",
-             ['Date', 'pHours', 'oHours', 'aHours', 'Total'])
-
-error_data = work[work['Total'] != (work['pHours'] + work['oHours'])]
-report_error(error_data, "mismatching sum of hours",
-             ['Date', 'pHours', 'oHours', 'Total'])
-
-error_data = work[work['Total'] < MIN_HOURS_PER_DAY]
-report_error(error_data, "hours per day below minimum",
-             ['Date', 'pHours', 'oHours', 'aHours', 'Total'])
-
-error_data = work[work['overhead'] > 0]
-report_error(error_data, "too many hours per day",
-             ['Date', 'pHours', 'oHours', 'aHours', 'Total', 'overhead'])
-
-overhead = sum(data['overhead'])
-if overhead > 0:
-    print("total overhead to distribute: {}".format(overhead))
-
-print("Total number or hours: {}".format(sum(data['Total'])))
-print("Number or hours for project: {}".format(sum(data['pHours'])))
+        print("[ERROR] {}:".format(desc), file=file)
+        columns = columns or [c for c in data[0]
+                              if c not in ('index', 'workday')]
+        def cell(value):
+            if value is None or (isinstance(value, float)
+                                 and math.isnan(value)):
+                return "NaN"
+            return str(value)
+        cells = [[cell(r[c]) for c in columns] for r in data]
+        index = [str(r['index']) for r in data]
+        iw = max(len(i) for i in index)
+        widths = [max([len(c)] + [len(row[i]) for row in cells])
+                  for i, c in enumerate(columns)]
+        print(" " * iw + "".join("  " + c.rjust(w)
+                                 for c, w in zip(columns, widths)), file=file)
+        for i, row in zip(index, cells):
+            print(i.ljust(iw) + "".join("  " + c.rjust(w)
+                                        for c, w in zip(row, widths)),
+                  file=file)
+        print(file=file)
+
+def check(project, data, file=None):
+    """Prints erroneous rows (to stdout or the given file)."""
+    # distinguish work day and weekend (or public holiday) when checking
+    weekend = [r for r in data if not r['workday']]
+    work = [r for r in data if r['workday']]
+
+    error_data = [r for r in weekend
+                  if r['pHours'] > 0 or r['oHours'] > 0 or r['aHours'] > 0]
+    report_error(error_data, "hours on weekend or public holiday",
+                 ['Date', 'pHours', 'oHours', 'aHours', 'Total'], file=file)
+
+    error_data = [r for r in work if r['pHours'] > 0 and r[project] is None]
+    report_error(error_data, "missing description of project",
+                 ['Date', project], file=file)
+
+    error_data = [r for r in work
+                  if r[project] is not None and len(r[project]) > 50]
+    report_error(error_data, "description of project too long",
+                 ['Date', project], file=file)
+
+    error_data = [r for r in work
+                  if r['pHours'] > 0 and (math.isnan(r['WP']) or r['WP'] < 0)]
+    report_error(error_data, "missing WP", ['Date', 'WP'], file=file)
+
+    error_data = [r for r in work
+                  if r['oHours'] > 0 and r['Other Activities'] is None]
+    report_error(error_data, "missing other activities description",
+                 ['Date', 'Other Activities', 'oHours'], file=file)
+
+    error_data = [r for r in work if r['aHours'] > 0 and r['Absence'] is None]
+    report_error(error_data, "missing absence description",
+                 ['Date', 'Absence', 'aHours'], file=file)
+
+    error_data = [r for r in work if r['Total'] <= 0 and r['aHours'] <= 0]
+    report_error(error_data, "missing hours",
+                 ['Date', 'pHours', 'oHours', 'aHours', 'Total'], file=file)
+
+    error_data = [r for r in work
+                  if r['Total'] != r['pHours'] + r['oHours']]
+    report_error(error_data, "mismatching sum of hours",
+                 ['Date', 'pHours', 'oHours', 'Total'], file=file)
+
+    error_data = [r for r in work if r['Total'] < MIN_HOURS_PER_DAY]
+    report_error(error_data, "hours per day below minimum",
+                 ['Date', 'pHours', 'oHours', 'aHours', 'Total'], file=file)
+
+    error_data = [r for r in work if r['overhead'] > 0]
+    report_error(error_data, "too many hours per day",
+                 ['Date', 'pHours', 'oHours', 'aHours', 'Total', 'overhead'],
+                 file=file)
+
+    overhead = sum(r['overhead'] for r in data)
+    if overhead > 0:
+        print("total overhead to distribute: {}".format(overhead), file=file)
+
+    print("Total number or hours: {}".format(
+        sum(r['Total'] for r in data if not math.isnan(r['Total']))),
+          file=file)
+    print("Number or hours for project: {}".format(
+        sum(r['pHours'] for r in data)), file=file)
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    with stages.stage('parse') as s:
+        try:
+            project, data = read(args.data)
+        except ValueError as e:
+            raise SystemExit("[ERROR] {}".format(e))
+        s['rows'] = len(data)
+    with stages.stage('check'):
+        check(project, data)
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
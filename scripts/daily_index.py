@@ -0,0 +1,153 @@
+"""Cumulative sums of the daily hours per main headline (h1) of an
+org-clock-csv export.
+
+Used by hours_index.py to sum up the hours of a date range. The index is
+stored next to the export (e.g., clocks.csv -> clocks.idx.npz), extended with
+new clock entries and rebuilt when the indexed entries have changed. The hours
+of a date range are the difference of two cumulative sums per project.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import orgclock
+
+
+#
+# index
+#
+
+def index_filename(data):
+    return os.path.splitext(data)[0] + ".idx.npz"
+
+def empty_index():
+    return {
+        'first': np.datetime64('NaT', 'D'),  # day of csum[:, 1]
+        'last': b'',  # start of the last indexed clock entry
+        'size': 0,  # size of the export when indexed
+        'mtime': 0,  # modification time (ns) of the export when indexed
+        'count': 0,  # number of indexed entries (data[:count])
+        'digest': '',  # fingerprint of the indexed entries
+        'projects': np.array([], dtype='S100'),
+        'csum': np.zeros((0, 1)),  # csum[:, d+1] = hours until day d
+    }
+
+def load_index(filename):
+    if not os.path.exists(filename):
+        return empty_index()
+    with np.load(filename) as f:
+        if 'digest' not in f.files:
+            return empty_index()  # older index without fingerprint
+        return {
+            'first': f['first'][()],
+            'last': f['last'][()],
+            'size': int(f['size']),
+            'mtime': int(f['mtime']),
+            'count': int(f['count']),
+            'digest': str(f['digest']),
+            'projects': f['projects'],
+            'csum': f['csum'],
+        }
+
+def save_index(filename, index):
+    np.savez(filename, **index)
+
+def fingerprint(data):
+    """Hash of loaded clock entries (hex, numpy strips trailing zero bytes)."""
+    return hashlib.sha1(np.ascontiguousarray(data).tobytes()).hexdigest()
+
+def extend(index, data):
+    """Adds the clock entries after the indexed ones (data[:count]) to the
+    index, these must be unchanged (see update()).
+
+    Only the new entries are binned into days; the cumulative sums are updated
+    from the first day touched by a new entry onwards.
+
+    """
+    new = data[index['count']:]
+    # new entries start at or after the last indexed one (sorted by start)
+    new = new[new['start'] >= index['last']]
+    days = orgclock.days(new)
+    new, days = new[~np.isnat(days)], days[~np.isnat(days)]
+    if len(new) == 0:
+        return dict(index, count=len(data), digest=fingerprint(data))
+    # bin new entries per (project, day)
+    heads = orgclock.h1(new)
+    hours = orgclock.hours(new)
+    projects = np.union1d(index['projects'], heads)
+    first = days[0] if np.isnat(index['first']) \
+        else min(index['first'], days[0])
+    ndays = (days[-1] - first).astype(int) + 1
+    daily = np.zeros((len(projects), ndays))
+    np.add.at(daily, (np.searchsorted(projects, heads),
+                      (days - first).astype(int)), hours)
+    # grow the existing sums to the new shape (extend last value)
+    csum = np.zeros((len(projects), ndays + 1))
+    if len(index['projects']) > 0:
+        offset = (index['first'] - first).astype(int)
+        old = index['csum']
+        rows = np.searchsorted(projects, index['projects'])
+        csum[rows, offset:offset + old.shape[1]] = old
+        csum[rows, offset + old.shape[1]:] = old[:, -1:]
+    # update sums from the first touched day onwards
+    d0 = (days[0] - first).astype(int)
+    csum[:, d0 + 1:] += np.cumsum(daily[:, d0:], axis=1)
+    return dict(index, first=first, last=new['start'][-1],
+                count=len(data), digest=fingerprint(data),
+                projects=projects, csum=csum)
+
+def stat(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+def update(filename, rebuild=False):
+    """Loads the index of an export and extends it with new clock entries.
+
+    The index is rebuilt if an indexed entry has been changed, removed or
+    inserted before the last indexed one.
+
+    """
+    idxname = index_filename(filename)
+    index = load_index(idxname)
+    size, mtime = stat(filename)
+    if rebuild:
+        index = empty_index()
+    elif (size, mtime) == (index['size'], index['mtime']):
+        return index
+    data = orgclock.load(filename)
+    count = index['count']
+    if count > len(data) or fingerprint(data[:count]) != index['digest']:
+        # indexed entries have been changed, start over
+        index = empty_index()
+    index = extend(index, data)
+    index['size'], index['mtime'] = size, mtime
+    save_index(idxname, index)
+    return index
+
+
+#
+# queries
+#
+
+def day_range(index, range_from, range_to):
+    """Index of the first and one past the last day in csum."""
+    ndays = index['csum'].shape[1] - 1
+    d0 = 0
+    d1 = ndays
+    if range_from is not None:
+        d0 = (np.datetime64(range_from, 'D') - index['first']).astype(int)
+    if range_to is not None:
+        d1 = (np.datetime64(range_to, 'D') - index['first']).astype(int) + 1
+    return int(np.clip(d0, 0, ndays)), int(np.clip(d1, 0, ndays))
+
+def total(index, d0, d1):
+    """Hours per project between day d0 and d1 (exclusive)."""
+    return index['csum'][:, d1] - index['csum'][:, d0]
+
+def rolling(index, d0, d1, window):
+    """Rolling average of hours per day for each day in [d0, d1)."""
+    ends = np.arange(d0, d1) + 1
+    starts = np.maximum(ends - window, 0)
+    return (index['csum'][:, ends] - index['csum'][:, starts]) / window
@@ -0,0 +1,152 @@
+"""Hours per main headline (h1) and period.
+
+Used by plot_hours_per_h1.py and plot_batch.py.
+"""
+
+import numpy as np
+
+import orgclock
+
+
+#
+# config
+#
+
+# numpy datetime units of the resolutions
+UNITS = {'d': 'D', 'm': 'M', 'y': 'Y'}
+MAX_POINTS = 1000  # per series, longer ones are downsampled
+MAX_TICKS = 36  # labelled months, otherwise only years are labelled
+
+
+#
+# binning
+#
+
+def projects(clocks, selected=None):
+    """Projects (h1, bytes) to plot. Default: all main headlines."""
+    if selected:
+        return [p.encode(orgclock.enc) for p in selected]
+    return sorted(set(clocks['h1']))
+
+def efforts(clocks, projects, resolution=None):
+    """Sums up hours per project and period.
+
+    The periods (days, months or years w.r.t. resolution) are counted from
+    the one of the first entry, i.e., periods without entries get a bin
+    too. Without resolution all hours are summed up in a single bin.
+
+    """
+    if resolution in UNITS:
+        periods = clocks['start'].astype('datetime64[' + UNITS[resolution] + ']')
+        binidx = (periods - periods[0]).astype(int)
+        nbins = binidx[-1] + 1
+    else:
+        binidx = np.zeros(len(clocks['start']), dtype=int)
+        nbins = 1
+    # find project's index, -1 for projects not plotted
+    order = np.argsort(projects)
+    sorted_projects = np.array(projects, dtype='S100')[order]
+    pos = np.clip(np.searchsorted(sorted_projects, clocks['h1']),
+                  0, len(projects) - 1)
+    found = sorted_projects[pos] == clocks['h1']
+    bins = np.zeros((len(projects), nbins))
+    np.add.at(bins, (order[pos][found], binidx[found]),
+              clocks['hours'][found])
+    return bins
+
+
+#
+# downsampling
+#
+
+def lttb(y, threshold):
+    """Indices of the points of y kept by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and the last point and from each of the threshold - 2
+    buckets in between the point that forms the largest triangle with the
+    previously kept point and the average of the next bucket, i.e., peaks
+    and valleys of the shape are preserved.
+
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)
+             ).astype(int) + 1
+    edges[-1] = n - 1
+    res = np.zeros(threshold, dtype=int)
+    res[-1] = n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # average of the next bucket (the last point for the last bucket)
+        nlo, nhi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = (nlo + nhi - 1) / 2
+        avg_y = y[nlo:nhi].mean()
+        x = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a])
+                      - (a - x) * (avg_y - y[a]))
+        a = res[b + 1] = lo + np.argmax(area)
+    return res
+
+
+#
+# plot
+#
+
+def ticks(resolution, start, n):
+    """Positions and labels of the x-ticks of n periods from start.
+
+    Months are labelled 'YYYY-MM' in January (and at the first tick) and
+    'MM' otherwise, only years are labelled if there are too many months.
+
+    """
+    if resolution == 'y':
+        year = np.datetime64(start, 'Y')
+        return list(range(n)), [str(year + i) for i in range(n)]
+    if resolution not in ('d', 'm'):
+        return [0], [""]
+    first = np.datetime64(start, UNITS[resolution])
+    periods = first + np.arange(n)
+    months = np.arange(periods[0].astype('datetime64[M]'),
+                       periods[-1].astype('datetime64[M]') + 1)
+    if len(months) > MAX_TICKS:
+        months = months[months.astype(int) % 12 == 0]  # Januaries
+    if resolution == 'd':
+        pos = (months.astype('datetime64[D]') - first).astype(int)
+    else:
+        pos = (months - first).astype(int)
+    months, pos = months[pos >= 0], pos[pos >= 0]
+    labels = [str(m) if i == 0 or m.astype(int) % 12 == 0 else str(m)[5:]
+              for i, m in enumerate(months)]
+    return list(pos), labels
+
+def plot(fig, bins, projects, resolution, start, stack=False,
+         max_points=MAX_POINTS):
+    """Draws the efforts into a (cleared) matplotlib figure.
+
+    start is the datetime of the first clock entry. Series longer than
+    max_points are downsampled (see lttb()).
+
+    """
+    ax = fig.add_subplot(1, 1, 1)
+    labels = [p.decode(orgclock.enc) for p in projects]
+    n = len(bins[0])
+    if stack:
+        # common points for all layers, shape of the total
+        idx = lttb(bins.sum(axis=0), max_points)
+        ax.stackplot(idx, bins[:, idx], baseline='zero', labels=labels)
+    else:
+        style = '-o' if n <= max_points else '-'
+        for i in range(len(projects)):
+            idx = lttb(bins[i], max_points)
+            ax.plot(idx, bins[i][idx], style, label=labels[i])
+
+    ax.set_title("Efforts")
+    ax.set_xlabel("range")
+    xticks, xlabels = ticks(resolution, start, n)
+    ax.set_xticks(xticks)
+    ax.set_xticklabels(xlabels, rotation=90 if resolution in ('d', 'm')
+                       else 0)
+    ax.set_ylabel("hours")
+    ax.legend()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Exports the parsed clock entries and the hours per day and main
+headline (h1) to columnar files (Parquet or Arrow, requires pyarrow).
+
+The clocks file has the columns start, end, hours, h1, parents, task, wp and
+wp_task (-1 if not given), the daily file day, h1 and hours. Text columns are
+categorical. The plot scripts accept the clocks file instead of the
+org-clock-csv export, e.g., to skip parsing of large exports.
+"""
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('data', type=str, nargs='+',
+                    help="""Input, csv files exported via org-clock-csv from
+                    org-agenda-files (or glob patterns, merged w/o
+                    duplicates).""")
+parser.add_argument('-o', '--output', type=str,
+                    help="""Output prefix, writes <prefix>.<format> (clocks)
+                    and <prefix>.daily.<format>. Default: input without
+                    extension (of the first input).""")
+parser.add_argument('--format', choices=['parquet', 'arrow'],
+                    default='parquet',
+                    help="""File format, Arrow files are memory-mapped when
+                    read. Default: parquet.""")
+instrument.add_arguments(parser)
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+
+    import columnar
+    import orgclock
+
+    first = orgclock.filenames(args.data)[0]
+    prefix = args.output or os.path.splitext(first)[0]
+    clocks_file = "{}.{}".format(prefix, args.format)
+    daily_file = "{}.daily.{}".format(prefix, args.format)
+
+    with stages.stage('load') as s:
+        data = orgclock.load_many(args.data)
+        s['rows'] = len(data)
+
+    with stages.stage('parse') as s:
+        clocks = orgclock.parse(data)
+        s['rows'] = len(clocks['start'])
+    if len(clocks['start']) == 0:
+        raise SystemExit("no clock entries in '{}'".format(
+            "', '".join(orgclock.filenames(args.data))))
+
+    with stages.stage('aggregate') as s:
+        clocks_table = columnar.clocks_table(clocks)
+        daily_table = columnar.daily_table(clocks)
+        s['rows'] = daily_table.num_rows
+
+    with stages.stage('write'):
+        columnar.write(clocks_table, clocks_file)
+        columnar.write(daily_table, daily_file)
+    print(clocks_file)
+    print(daily_file)
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
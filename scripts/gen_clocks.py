@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+
+import instrument
+import workcal
+
+
+#
+# config
+#
+
+desc = """Generates a synthetic org-clock-csv export (e.g., for benchmarks or
+bug reports without sharing your real clocks).
+
+Each working day (no weekend or public holiday) consists of a number of clock
+entries on the given headlines and optionally a lunch break. Some days are
+absences (vacation, sick leave) and the tasks of the first headline (the
+project) are annotated with work packages (e.g., 'WP2.1'). Like org-clock-csv,
+the entries are grouped by headline and not sorted by time.
+"""
+
+def valid_date(s):
+    try:
+        return datetime.strptime(s, "%Y-%m-%d")
+    except ValueError:
+        msg = "Not a valid date: '{0}'.".format(s)
+        raise argparse.ArgumentTypeError(msg)
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('-s', '--start', type=valid_date,
+                    default=datetime(2015, 1, 1),
+                    help="""First day in format 'YYYY-MM-DD'. Default:
+                    2015-01-01.""")
+parser.add_argument('-y', '--years', type=float, default=1,
+                    help="""Number of years to generate. Default: 1.""")
+parser.add_argument('-p', '--headlines', type=str, nargs='+',
+                    default=['IoT4CPS/WP2', 'IoT4CPS/WP3', 'Teaching/LVA',
+                             'Research/Paper', 'Training', 'Administration'],
+                    help="""Headline tree as org paths (the 'parents' of the
+                    clock entries). The main headline (h1) of the first one is
+                    the project. Default: IoT4CPS/WP2 IoT4CPS/WP3 Teaching/LVA
+                    Research/Paper Training Administration.""")
+parser.add_argument('-e', '--entries', type=int, default=5,
+                    help="""Mean number of clock entries per working day.
+                    Default: 5.""")
+parser.add_argument('-l', '--lunch', type=float, default=0.8,
+                    help="""Probability of a lunch break on a working day.
+                    Default: 0.8.""")
+parser.add_argument('-a', '--absence', type=float, default=0.05,
+                    help="""Probability that a working day is an absence.
+                    Default: 0.05.""")
+parser.add_argument('-w', '--work-packages', type=float, default=0.7,
+                    help="""Probability that a task of the project names its
+                    work package. Default: 0.7.""")
+parser.add_argument('--seed', type=int, default=0,
+                    help="""Seed of the random generator. Default: 0.""")
+parser.add_argument('-o', '--output', type=str,
+                    help="""Output file. Default: stdout.""")
+instrument.add_arguments(parser)
+
+
+#
+# generate
+#
+
+HEADER = "task,parents,category,start,end,effort,ishabit,tags"
+ABSENCES = ["Vacation", "Sick leave", "Conference"]
+
+def entry(task, parents, start, end):
+    return "{},{},,{:%Y-%m-%d %H:%M},{:%Y-%m-%d %H:%M},,,".format(
+        task, parents, start, end)
+
+def task_name(rnd, parents, project, wp):
+    """Task description (project tasks may name their work package)."""
+    name = "task {}".format(rnd.randint(1, 40))
+    if parents.split('/', 1)[0] == project and rnd.random() < wp:
+        name += " WP{}.{}".format(rnd.randint(1, 5), rnd.randint(1, 4))
+    return name
+
+def day_entries(rnd, day, args):
+    """Clock entries (headline, line) of a single day."""
+    res = []
+    cal, i = workcal.index(day)
+    if not cal['workday'][i]:
+        return res
+    if rnd.random() < args.absence:
+        start = day.replace(hour=8)
+        res.append(("Absence", entry(rnd.choice(ABSENCES), "Absence", start,
+                                     start + timedelta(hours=8))))
+        return res
+    project = args.headlines[0].split('/', 1)[0]
+    t = day.replace(hour=7) + timedelta(minutes=15*rnd.randint(0, 8))
+    n = max(1, int(rnd.gauss(args.entries, 1)))
+    lunch_after = n // 2 if rnd.random() < args.lunch else -1
+    for i in range(n):
+        parents = rnd.choice(args.headlines)
+        end = t + timedelta(minutes=15*rnd.randint(2, 12))
+        res.append((parents, entry(task_name(rnd, parents, project,
+                                             args.work_packages),
+                                   parents, t, end)))
+        t = end + timedelta(minutes=5*rnd.randint(0, 3))
+        if i == lunch_after:
+            end = t + timedelta(minutes=30)
+            res.append(("Lunch", entry("Lunch", "", t, end)))
+            t = end
+    return res
+
+def generate(args):
+    """Lines of the export (header first)."""
+    rnd = random.Random(args.seed)
+    headlines = {}  # lines per headline (org-clock-csv order)
+    day = args.start
+    end = args.start + timedelta(days=int(args.years*365.25))
+    while day < end:
+        for h, line in day_entries(rnd, day, args):
+            headlines.setdefault(h, []).append(line)
+        day = day + timedelta(days=1)
+    lines = [HEADER]
+    for h in headlines:
+        lines.extend(headlines[h])
+    return lines
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    with stages.stage('generate') as s:
+        lines = generate(args)
+        s['rows'] = len(lines) - 1
+    with stages.stage('write'):
+        res = "\n".join(lines) + "\n"
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(res)
+        else:
+            sys.stdout.write(res)
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
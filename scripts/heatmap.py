@@ -0,0 +1,217 @@
+"""Weekday x week heatmap of clocked hours.
+
+Bins the clock entries into a matrix and plots it with matplotlib or writes
+it as svg or png without matplotlib (used by plot_heatmap.py with --native).
+"""
+
+import struct
+import zlib
+import numpy as np
+from datetime import datetime
+
+
+#
+# config
+#
+
+COLORS = [(0.9, 0.9, 0.9), (0.0, 0.4, 0.6)]  # 0h .. VMAX hours
+LEVELS = 10  # number of discrete colors
+VMAX = 8
+CELL = 12  # cell size in pixel
+MARGIN = (30, 40, 30, 10)  # top, left, bottom, right in pixel
+
+
+#
+# binning
+#
+
+def week(dt):
+    """Week number of the year (Monday as first day, like '%W')."""
+    return int(dt.strftime('%W'))
+
+def efforts(starts, hours):
+    """Sums up hours per weekday and week.
+
+    starts is an array of datetime64. Returns the week numbers (x), the bins
+    (8 x len(x), one row per weekday where Monday is row 6 and Sunday row 0)
+    and the first and last day (datetime).
+
+    """
+    days = starts.astype('datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    weekday = (days.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    yday = (days - years).astype(int)
+    weeks = (yday + 7 - weekday) // 7  # like '%W'
+    dyears = (years - years[0]).astype(int)
+    dt0 = starts[0].astype(datetime)
+    dt1 = starts[-1].astype(datetime)
+    week0 = weeks[0]
+    # shape of efforts map
+    x = np.arange(week0, dyears[-1]*52 + weeks[-1] + 2)
+    bins = np.zeros((8, len(x)))
+    np.add.at(bins, (6 - weekday, dyears*52 + weeks - week0), hours)
+    return x, bins, dt0, dt1
+
+def month_ticks(dt0, dt1):
+    """Positions (in weeks) and labels of the first day of each month."""
+    months = []
+    year, month = dt0.year, dt0.month
+    while (year, month) <= (dt1.year, dt1.month):
+        months.append(dt0.replace(year=year, month=month, day=1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    xticks = [(dt.year-dt0.year)*52 + week(dt) + dt.weekday()/7
+              for dt in months]
+    xlabels = [dt.strftime('%Y-%m') if dt.month == 1 else dt.strftime('%m')
+               for dt in months]
+    return xticks, xlabels
+
+
+#
+# colors
+#
+
+def rgb(bins):
+    """Maps hours to (discrete) colors, returns uint8 array (..., 3)."""
+    level = np.clip(bins / VMAX, 0, 1) * LEVELS
+    level = np.minimum(level.astype(int), LEVELS - 1) / (LEVELS - 1)
+    c0, c1 = np.array(COLORS)
+    return np.round((c0 + level[..., None] * (c1 - c0)) * 255).astype(np.uint8)
+
+
+#
+# matplotlib
+#
+
+def plot(fig, x, bins, xticks, xlabels, title="Efforts Heatmap",
+         subplot=(1, 1, 1)):
+    """Draws the heatmap into a (cleared) matplotlib figure or into the
+    given subplot (rows, columns, index) of it."""
+    from matplotlib.colors import LinearSegmentedColormap
+    cm = LinearSegmentedColormap.from_list('efforts', COLORS, N=LEVELS)
+    ax = fig.add_subplot(*subplot)
+    ax.pcolormesh(x, np.arange(0, 8), bins, vmin=0, vmax=VMAX, cmap=cm,
+                  edgecolors='w')
+    ax.set_title(title)
+    ax.set_xticks(xticks)
+    ax.set_xticklabels(xlabels)
+    ax.set_yticks([6.5, 4.5, 2.5])
+    ax.set_yticklabels(["Mon", "Wed", "Fri"])
+
+
+#
+# svg
+#
+
+def svg(x, bins, xticks, xlabels, title="Efforts Heatmap"):
+    """Returns the heatmap as svg document (string).
+
+    Like pcolormesh with flat shading, the cell (row, col) spans x[col] to
+    x[col+1], i.e., the last column and the row above Monday are not drawn.
+
+    """
+    top, left, bottom, right = MARGIN
+    rows, cols = 7, len(x) - 1
+    width = left + cols*CELL + right
+    height = top + rows*CELL + bottom
+    colors = rgb(bins)
+    res = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" '
+           'font-family="sans-serif" font-size="9">'.format(width, height)]
+    res.append('<text x="{}" y="{}" text-anchor="middle" font-size="12">'
+               '{}</text>'.format(width / 2, top - 10, title))
+    res.append('<g stroke="white" stroke-width="1">')
+    for r in range(rows):
+        y = top + (rows - 1 - r)*CELL
+        for c in range(cols):
+            res.append('<rect x="{}" y="{}" width="{}" height="{}" '
+                       'fill="#{:02x}{:02x}{:02x}"/>'.format(
+                           left + c*CELL, y, CELL, CELL, *colors[r, c]))
+    res.append('</g>')
+    for label, r in [("Mon", 6), ("Wed", 4), ("Fri", 2)]:
+        res.append('<text x="{}" y="{}" text-anchor="end" '
+                   'dominant-baseline="middle">{}</text>'.format(
+                       left - 4, top + (rows - 1 - r + 0.5)*CELL, label))
+    for xt, label in zip(xticks, xlabels):
+        px = left + (xt - x[0])*CELL
+        res.append('<line x1="{0:.1f}" y1="{1}" x2="{0:.1f}" y2="{2}" '
+                   'stroke="black"/>'.format(px, top + rows*CELL,
+                                             top + rows*CELL + 3))
+        res.append('<text x="{:.1f}" y="{}" text-anchor="middle">{}</text>'
+                   .format(px, top + rows*CELL + 13, label))
+    res.append('</svg>')
+    return "\n".join(res) + "\n"
+
+
+#
+# png
+#
+
+# 3x5 pixel font for the month labels
+DIGITS = {
+    '0': "111101101101111", '1': "010110010010111", '2': "111001111100111",
+    '3': "111001111001111", '4': "101101111001001", '5': "111100111001111",
+    '6': "111100111101111", '7': "111001001001001", '8': "111101111101111",
+    '9': "111101111001111", '-': "000000111000000",
+}
+
+def draw_text(img, x, y, text):
+    """Draws text (digits and '-' only) centered at x, top at y, clipped to
+    the image."""
+    height, width = img.shape[:2]
+    x = int(x - (4*len(text) - 1) / 2)
+    for ch in text:
+        glyph = np.array([int(b) for b in DIGITS.get(ch, "0"*15)],
+                         dtype=bool).reshape(5, 3)
+        x0, x1 = max(x, 0), min(x + 3, width)
+        y0, y1 = max(y, 0), min(y + 5, height)
+        if x0 < x1 and y0 < y1:
+            region = img[y0:y1, x0:x1]
+            region[glyph[y0 - y:y1 - y, x0 - x:x1 - x]] = 0
+        x += 4
+
+def raster(x, bins, xticks, xlabels):
+    """Renders the heatmap to an RGB image (uint8 array)."""
+    top, left, bottom, right = MARGIN
+    rows, cols = 7, len(x) - 1
+    img = np.full((top + rows*CELL + bottom, left + cols*CELL + right, 3),
+                  255, dtype=np.uint8)
+    # rows are drawn top down (Monday first), 1px white cell border
+    cells = np.repeat(np.repeat(rgb(bins[rows-1::-1, :cols]), CELL, axis=0),
+                      CELL, axis=1)
+    cells[CELL-1::CELL, :] = 255
+    cells[:, CELL-1::CELL] = 255
+    img[top:top + rows*CELL, left:left + cols*CELL] = cells
+    for xt, label in zip(xticks, xlabels):
+        px = int(round(left + (xt - x[0])*CELL))
+        if px < 0 or px >= img.shape[1]:
+            continue  # tick outside of the image
+        img[top + rows*CELL:top + rows*CELL + 3, px] = 0
+        draw_text(img, px, top + rows*CELL + 5, label)
+    return img
+
+def png(img):
+    """Encodes an RGB image (uint8 array) as png (bytes)."""
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data \
+            + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    height, width, _ = img.shape
+    # filter type 0 (none) at the beginning of each scanline
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8),
+                     img.reshape(height, width*3)]).tobytes()
+    return b'\x89PNG\r\n\x1a\n' \
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) \
+        + chunk(b'IDAT', zlib.compress(raw)) \
+        + chunk(b'IEND', b'')
+
+
+#
+# output
+#
+
+def export(filename, x, bins, xticks, xlabels):
+    """Writes the heatmap to a svg or png file (w.r.t. file extension)."""
+    if filename.lower().endswith(".png"):
+        with open(filename, 'wb') as f:
+            f.write(png(raster(x, bins, xticks, xlabels)))
+    else:
+        with open(filename, 'w') as f:
+            f.write(svg(x, bins, xticks, xlabels))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import argparse
+from datetime import datetime
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Answers questions like 'how many hours for a project between two
+dates' from a cumulative-sum index of the daily hours per main headline (h1,
+see daily_index.py).
+
+The index is stored next to the org-clock-csv export (e.g., clocks.csv ->
+clocks.idx.npz). It is built on first use and afterwards only extended by the
+clock entries newer than the last indexed one. If an indexed entry has been
+changed (detected by a fingerprint of the indexed entries), the index is
+rebuilt. Totals and averages of a date range are then two lookups per project,
+independent of the length of the range.
+"""
+
+def valid_date(s):
+    try:
+        return datetime.strptime(s, "%Y-%m-%d")
+    except ValueError:
+        msg = "Not a valid date: '{0}'.".format(s)
+        raise argparse.ArgumentTypeError(msg)
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('data', type=str,
+                    help="""Input, a csv file exported via org-clock-csv from
+                    org-agenda-files.""")
+parser.add_argument('-f', '--from', dest='range_from', type=valid_date,
+                    help="""Start date in format 'YYYY-MM-DD' (inclusive).
+                    Default: first indexed day.""")
+parser.add_argument('-t', '--to', dest='range_to', type=valid_date,
+                    help="""End date in format 'YYYY-MM-DD' (inclusive).
+                    Default: last indexed day.""")
+parser.add_argument('-p', '--projects', type=str, nargs='+',
+                    help="""List of projects (main headlines). Default: all
+                    projects.""")
+parser.add_argument('-r', '--rolling', type=int,
+                    help="""Print the rolling average of hours per day over
+                    the given number of days (as csv) for each day of the
+                    range instead of the range totals.""")
+parser.add_argument('--rebuild', action='store_true',
+                    help="""Rebuild the index from scratch (done
+                    automatically when indexed clocks have been changed).""")
+instrument.add_arguments(parser)
+
+
+#
+# output
+#
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+
+    import daily_index
+    import numpy as np
+    import orgclock
+
+    with stages.stage('index') as s:
+        index = daily_index.update(args.data, args.rebuild)
+        s['rows'] = index['csum'].shape[1] - 1
+    if np.isnat(index['first']):
+        raise SystemExit("no clock entries in '{}'".format(args.data))
+
+    rows = range(len(index['projects']))
+    if args.projects:
+        selected = [p.encode(orgclock.enc) for p in args.projects]
+        rows = [i for i, p in enumerate(index['projects']) if p in selected]
+    names = [index['projects'][i].decode(orgclock.enc) for i in rows]
+
+    d0, d1 = daily_index.day_range(index, args.range_from, args.range_to)
+    if args.rolling:
+        with stages.stage('query'):
+            avg = daily_index.rolling(index, d0, d1, args.rolling)[rows]
+        print(";".join(["Date"] + names))
+        for j, d in enumerate(range(d0, d1)):
+            day = index['first'] + np.timedelta64(d, 'D')
+            print(";".join([str(day)] + ["{:.2f}".format(a)
+                                         for a in avg[:, j]]))
+    else:
+        with stages.stage('query'):
+            hours = daily_index.total(index, d0, d1)[rows]
+        weeks = max(d1 - d0, 1) / 7
+        print("{:30} {:>10} {:>10}".format("project", "hours", "per week"))
+        for name, h in zip(names, hours):
+            print("{:30} {:10.1f} {:10.1f}".format(name, h, h / weeks))
+        print("{:30} {:10.1f} {:10.1f}".format("total", sum(hours),
+                                               sum(hours) / weeks))
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Wall time, row counts and peak memory of named stages.
+
+Shared by the scripts for their --timings, --timings-json and --profile
+options:
+
+    stages = instrument.Stages(args)
+    with stages.stage('parse') as s:
+        clocks = parse(data)
+        s['rows'] = len(clocks)
+    stages.report()
+
+Without any of the options the stages only cost a function call.
+"""
+
+import contextlib
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+
+
+#
+# arguments
+#
+
+def add_arguments(parser):
+    """Adds the instrumentation options to an argument parser."""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--timings', action='store_true',
+                       help="""Print wall time, rows and peak memory of each
+                       stage to stderr (tracing memory slows down the
+                       run).""")
+    group.add_argument('--timings-json', type=str, metavar='FILE',
+                       help="""Write the timings of each stage to a json
+                       file.""")
+    group.add_argument('--profile', type=str, metavar='STAGE',
+                       help="""Dump a cProfile of the given stage to
+                       STAGE.prof (view, e.g., with 'python -m pstats').""")
+
+
+#
+# stages
+#
+
+class Stages:
+    """Collects the measurements of named stages."""
+
+    def __init__(self, args=None, enabled=None, memory=None):
+        self.timings = getattr(args, 'timings', False)
+        self.json = getattr(args, 'timings_json', None)
+        self.profile = getattr(args, 'profile', None)
+        self.enabled = bool(self.timings or self.json or self.profile) \
+            if enabled is None else enabled
+        self.memory = self.enabled if memory is None else memory
+        self.results = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Measures the enclosed block, yields a dict for extra values
+        (e.g., 'rows')."""
+        record = {}
+        if not self.enabled:
+            yield record
+            return
+        profiler = cProfile.Profile() if name == self.profile else None
+        if self.memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        if profiler:
+            profiler.enable()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['time'] = time.perf_counter() - t0
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats("{}.prof".format(name))
+            if self.memory:
+                record['peak'] = tracemalloc.get_traced_memory()[1] - mem0
+            self.results[name] = dict(self.results.get(name, {}), **record)
+
+    def report(self, file=sys.stderr):
+        """Prints the stages (--timings) and writes json (--timings-json)."""
+        if self.timings and self.results:
+            print("{:16} {:>10} {:>10} {:>10}".format(
+                "stage", "time [ms]", "rows", "peak [kB]"), file=file)
+            for name, r in self.results.items():
+                print("{:16} {:10.1f} {:>10} {:>10}".format(
+                    name, r['time']*1000, r.get('rows', ""),
+                    "{:.0f}".format(r['peak']/1024) if 'peak' in r else ""),
+                    file=file)
+        if self.json:
+            with open(self.json, 'w') as f:
+                json.dump(self.results, f, indent=2)
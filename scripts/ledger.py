@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+import sys
+
+import instrument
+import monthsheet
+import workcal
+
+
+#
+# config
+#
+
+MAX_HOURS_PER_DAY = 10
+
+desc = """Keeps the flexitime balance (hours against contract hours) across
+monthly timesheets.
+
+The ledger stores a checkpoint per month (worked hours, absences, contract
+hours, overhead and the balance carried over to the next month). Adding or
+changing a month only recomputes the balance from that month onwards, older
+checkpoints are kept as they are.
+"""
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('data', type=str, nargs='*',
+                    help="""Input, monthly timesheets (csv) to add to or
+                    update in the ledger.""")
+parser.add_argument('-l', '--ledger', type=str, default="ledger.json",
+                    help="""Ledger file. Default: ledger.json""")
+parser.add_argument('-c', '--contract', type=float, default=8,
+                    help="""Contract hours per working day (used for the
+                    months added with this call). Default: 8""")
+parser.add_argument('-i', '--initial', type=float,
+                    help="""Balance before the first month of the ledger.""")
+parser.add_argument('-e', '--export', type=str,
+                    help="""Export the balance series to a csv file (e.g., for
+                    plotting).""")
+instrument.add_arguments(parser)
+
+
+#
+# ledger
+#
+
+def load(filename):
+    if not os.path.exists(filename):
+        return {'initial': 0.0, 'months': []}
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+def save(filename, ledger):
+    with open(filename, 'w') as f:
+        json.dump(ledger, f, indent=2)
+
+def month_summary(filename, contract):
+    """Sums up a monthly timesheet (csv) to a checkpoint without balance."""
+    checkpoint = {
+        'month': None,
+        'worked': 0.0,
+        'absence': 0.0,
+        'contract': 0.0,
+        'overhead': 0.0,
+        'balance': None,
+    }
+    for row in monthsheet.read(filename)['rows']:
+        date = row[monthsheet.DATE]
+        if checkpoint['month'] is None:
+            checkpoint['month'] = "{:%Y-%m}".format(date)
+        total = row[monthsheet.TOTAL]
+        total = total if not math.isnan(total) else 0.0
+        checkpoint['worked'] += total
+        checkpoint['absence'] += row[monthsheet.AHOURS]
+        checkpoint['overhead'] += max(total - MAX_HOURS_PER_DAY, 0)
+        cal, day = workcal.index(date, contract)
+        checkpoint['contract'] += cal['hours'][day]
+    return checkpoint
+
+def update(ledger, checkpoints):
+    """Adds or replaces months and carries the balance over from the first
+    changed month onwards."""
+    months = {c['month']: c for c in ledger['months']}
+    for c in checkpoints:
+        months[c['month']] = c
+    ledger['months'] = [months[m] for m in sorted(months)]
+    changed = [c['month'] for c in checkpoints]
+    if not changed:
+        return ledger
+    # balance of the month before the first changed one
+    first = sorted(months).index(min(changed))
+    balance = ledger['initial'] if first == 0 \
+        else ledger['months'][first-1]['balance']
+    for c in ledger['months'][first:]:
+        balance += c['worked'] + c['absence'] - c['contract']
+        c['balance'] = balance
+    return ledger
+
+
+#
+# output
+#
+
+def print_ledger(ledger):
+    print("{:8} {:>8} {:>8} {:>8} {:>8} {:>8}".format(
+        "month", "worked", "absence", "contract", "overhead", "balance"))
+    for c in ledger['months']:
+        print("{month:8} {worked:8.1f} {absence:8.1f} {contract:8.1f} "
+              "{overhead:8.1f} {balance:8.1f}".format(**c))
+
+def export(filename, ledger):
+    with open(filename, 'w') as f:
+        f.write("Month;Balance;Overhead\n")
+        for c in ledger['months']:
+            f.write("{};{:.1f};{:.1f}\n".format(c['month'], c['balance'],
+                                               c['overhead']))
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    ledger = load(args.ledger)
+    checkpoints = []
+    with stages.stage('parse') as s:
+        for d in args.data:
+            try:
+                c = month_summary(d, args.contract)
+            except ValueError as e:
+                raise SystemExit("[ERROR] {}".format(e))
+            if c['month'] is None:
+                print("[WARN ] no rows in '{}'".format(d), file=sys.stderr)
+                continue
+            checkpoints.append(c)
+        s['rows'] = len(checkpoints)
+    if args.initial is not None and args.initial != ledger['initial']:
+        ledger['initial'] = args.initial
+        # initial balance changes all months
+        checkpoints = ledger['months'][:1] + checkpoints
+    with stages.stage('update') as s:
+        ledger = update(ledger, checkpoints)
+        s['rows'] = len(ledger['months'])
+    save(args.ledger, ledger)
+    print_ledger(ledger)
+    if args.export:
+        export(args.export, ledger)
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Byte ranges of the clock entries per month of an org-clock-csv export.
+
+Used by org2csv.py (--index) to parse only the rows of the requested month.
+The index is stored next to the export (e.g., clocks.csv ->
+clocks.months.npz) and rebuilt in a single pass over the export when its
+size or modification time has changed. The rows of a month are read from the
+memory-mapped export.
+"""
+
+import mmap
+import os
+
+import numpy as np
+
+import orgclock
+
+
+#
+# index
+#
+
+def index_filename(data):
+    return os.path.splitext(data)[0] + ".months.npz"
+
+def stat(data):
+    st = os.stat(data)
+    return st.st_size, st.st_mtime_ns
+
+def build(data):
+    """Index of an export, adjacent rows of a month are merged to a range."""
+    size, mtime = stat(data)
+    ranges = {}  # month -> [[begin, end], ...]
+    with open(data, 'rb') as f:
+        header = f.readline()
+        col = header.decode(orgclock.enc).strip().split(',').index('start')
+        offset = len(header)
+        for line in f:
+            fields = line.split(b',', col + 1)
+            month = fields[col][:7] if len(fields) > col else b''
+            end = offset + len(line)
+            r = ranges.setdefault(month, [])
+            if r and r[-1][1] == offset:
+                r[-1][1] = end
+            else:
+                r.append([offset, end])
+            offset = end
+    months = sorted(ranges)
+    counts = [len(ranges[m]) for m in months]
+    return {
+        'size': size,
+        'mtime': mtime,
+        'months': np.array(months, dtype='S7'),
+        # ranges of months[i] are ranges[bounds[i]:bounds[i+1]]
+        'bounds': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        'ranges': np.array([r for m in months for r in ranges[m]],
+                           dtype=np.int64).reshape(-1, 2),
+    }
+
+def load_index(filename):
+    with np.load(filename) as f:
+        return {k: f[k] for k in f.files}
+
+def save_index(filename, index):
+    np.savez(filename, **index)
+
+def update(data):
+    """Loads the index of an export, (re)builds it if outdated."""
+    filename = index_filename(data)
+    if os.path.exists(filename):
+        index = load_index(filename)
+        if (int(index['size']), int(index['mtime'])) == stat(data):
+            return index
+    index = build(data)
+    save_index(filename, index)
+    return index
+
+def month_ranges(index, month):
+    """Byte ranges (begin, end) of the rows of a month (datetime)."""
+    key = "{:%Y-%m}".format(month).encode(orgclock.enc)
+    i = np.searchsorted(index['months'], key)
+    if i == len(index['months']) or index['months'][i] != key:
+        return index['ranges'][:0]
+    return index['ranges'][index['bounds'][i]:index['bounds'][i + 1]]
+
+
+#
+# read data
+#
+
+def lines(data, month):
+    """Lines (bytes, without header) of the rows of the given month."""
+    ranges = month_ranges(update(data), month)
+    res = []
+    if len(ranges):
+        with open(data, 'rb') as f, \
+             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for begin, end in ranges:
+                res.extend(m[begin:end].splitlines())
+    return res
+
+def load(data, month):
+    """Like orgclock.load() but only the rows of the given month."""
+    return orgclock.load(data, lines(data, month))
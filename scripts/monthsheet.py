@@ -0,0 +1,161 @@
+"""Schema of the monthly timesheet (csv) and its typed loader.
+
+A timesheet is a dict with the 'project' (name of the second column) and the
+'rows', a tuple of typed values per day in the order of COLUMNS:
+
+    sheet = monthsheet.read("2018-01.csv")
+    for row in sheet['rows']:
+        row[monthsheet.DATE], row[monthsheet.PHOURS]
+
+org2csv.py creates timesheets (see timesheet()) and writes them, csv_check.py,
+csv2tex.py and ledger.py read them. Within a process the timesheet can be
+passed from org2csv to the others directly (e.g., serve.py).
+
+Standard library only (used by csv_check.py which does without numpy).
+"""
+
+import csv
+import math
+from datetime import datetime
+
+import workcal
+
+
+#
+# schema
+#
+
+# (name, type) of the columns, the name of the project column is the project
+COLUMNS = [
+    ("Date", 'date'),
+    (None, 'str'),  # description of the project activities
+    ("WP", 'int'),
+    ("Task", 'int'),
+    ("ACT", 'str'),
+    ("pHours", 'hours'),
+    ("Other Activities", 'str'),
+    ("oHours", 'hours'),
+    ("Absence", 'str'),
+    ("aHours", 'hours'),
+    ("Total", 'float'),
+]
+DATE, PROJECT, WP, TASK, ACT, PHOURS, OTHER, OHOURS, ABSENCE, AHOURS, TOTAL = \
+    range(len(COLUMNS))
+
+DATE_FORMAT = "%Y-%m-%d %a"
+
+enc = 'utf-8'
+
+def to_int(s):
+    f = float(s)
+    if not f.is_integer():
+        raise ValueError("not an integer: '{}'".format(s))
+    return int(f)
+
+# type -> (value of an empty cell, conversion of a non-empty cell)
+TYPES = {
+    'date': (None, workcal.parse),
+    'str': ("", str),
+    'int': (-1, to_int),  # -1 like in org2csv (no WP or task)
+    'hours': (0.0, float),
+    'float': (math.nan, float),
+}
+
+def header(project):
+    """Column names of a timesheet of the given project."""
+    return [project if name is None else name for name, _ in COLUMNS]
+
+def row(date, desc, wp, task=-1, act="", phours=8, other="", ohours=0,
+        absence="", ahours=0, total=8):
+    """Typed values of a day (arguments like org2csv.clock_rows)."""
+    return (date.date() if isinstance(date, datetime) else date, desc, wp,
+            task, act, float(phours), other, float(ohours), absence,
+            float(ahours), float(total))
+
+def timesheet(project, rows):
+    """Timesheet from the values of the days (dicts, see row())."""
+    return {'project': project, 'rows': [row(**r) for r in rows]}
+
+def workday(values):
+    """Whether the date of a row is a working day (see workcal)."""
+    cal, i = workcal.index(values[DATE])
+    return cal['workday'][i]
+
+
+#
+# read
+#
+
+def parse(lines):
+    """Timesheet from the lines of a csv (';' separated, with header).
+
+    Empty cells get the defaults of their type (see TYPES). Raises a
+    ValueError on rows that do not match the schema.
+
+    """
+    reader = csv.reader(lines, delimiter=';')
+    names = next(reader, None)
+    if names is None or len(names) != len(COLUMNS):
+        raise ValueError("expected the {} columns {}".format(
+            len(COLUMNS), ";".join(header("<project>"))))
+    if names != header(names[PROJECT]):
+        raise ValueError("unexpected header '{}'".format(";".join(names)))
+    types = [TYPES[t] for _, t in COLUMNS]
+    rows = []
+    for cells in reader:
+        if not cells:
+            continue  # empty line
+        if len(cells) != len(COLUMNS):
+            raise ValueError("line {}: expected {} columns, got {}".format(
+                reader.line_num, len(COLUMNS), len(cells)))
+        values = []
+        for name, (empty, convert), cell in zip(names, types, cells):
+            if cell == "":
+                values.append(empty)
+                continue
+            try:
+                values.append(convert(cell))
+            except ValueError:
+                raise ValueError("line {}: invalid {} '{}'".format(
+                    reader.line_num, name, cell))
+        if values[DATE] is None:
+            raise ValueError("line {}: missing Date".format(reader.line_num))
+        rows.append(tuple(values))
+    return {'project': names[PROJECT], 'rows': rows}
+
+def read(filename):
+    """Reads a timesheet from a csv file (see parse)."""
+    with open(filename, 'r', encoding=enc, newline='') as f:
+        try:
+            return parse(f)
+        except ValueError as e:
+            raise ValueError("{}: {}".format(filename, e))
+
+
+#
+# write
+#
+
+def cells(values):
+    """Cells (str) of a row, empty for missing values and no hours."""
+    date, desc, wp, task, act, phours, other, ohours, absence, ahours, \
+        total = values
+    return [
+        "{:{}}".format(date, DATE_FORMAT),
+        desc,
+        "{:d}".format(wp) if wp != -1 else "",
+        "{:d}".format(task) if task != -1 else "",
+        act,
+        "{:.1f}".format(phours) if phours > 0 else "",
+        other,
+        "{:.1f}".format(ohours) if ohours > 0 else "",
+        absence,
+        "{:.1f}".format(ahours) if ahours > 0 else "",
+        "{:.1f}".format(total) if not math.isnan(total) else "",
+    ]
+
+def write(sheet, f):
+    """Writes the timesheet as csv to a text file object."""
+    writer = csv.writer(f, delimiter=';', lineterminator='\n')
+    writer.writerow(header(sheet['project']))
+    writer.writerows(cells(r) for r in sheet['rows'])
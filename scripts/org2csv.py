@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 
 import argparse
-import numpy as np
-from datetime import datetime, timedelta
+import csv
+import io
+from datetime import datetime
+
+import instrument
+import monthsheet
+import workcal
 
 
 #
@@ -33,9 +38,11 @@ def valid_month(s):
         raise argparse.ArgumentTypeError(msg)
 
 parser = argparse.ArgumentParser(description=desc)
-parser.add_argument('data', type=str,
-                    help="""Input, a csv file exported via org-clock-csv from
-                    org-agenda-files.""")
+parser.add_argument('data', type=str, nargs='+',
+                    help="""Input, csv files exported via org-clock-csv from
+                    org-agenda-files (or glob patterns). Several exports are
+                    merged, entries found in more than one are counted
+                    once.""")
 parser.add_argument('-m', '--month', type=valid_month,
                     default=datetime.today(),
                     help="""Month in format 'YYYY-MM', e.g.,
@@ -48,7 +55,19 @@ parser.add_argument('-w', '--work-package', type=int, default=-1,
                     help="""Default work package (will be used if no work
                     package can be found in the description of the clock
                     entries).""")
-args = parser.parse_args()
+parser.add_argument('-i', '--index', action='store_true',
+                    help="""Parse only the clock entries of the month using
+                    an index of each export (created or updated next to the
+                    export, see month_index.py). Speeds up large exports.""")
+parser.add_argument('-s', '--stream', action='store_true',
+                    help="""Read the exports line by line and keep only the
+                    clock entries of the month, i.e., memory depends on the
+                    month and not on the size of the exports. Default: load
+                    the exports (in parallel).""")
+parser.add_argument('-c', '--check', action='store_true',
+                    help="""Check the timesheet for errors (like
+                    csv_check.py) without reading the csv back.""")
+instrument.add_arguments(parser)
 
 
 #
@@ -57,102 +76,157 @@ args = parser.parse_args()
 
 enc = 'utf-8'
 
-# load into numpy array
-data = np.genfromtxt(args.data, delimiter=',', dtype=None, names=True,
-                     invalid_raise=False)
+def read(data, month):
+    """Reads the clock entries of a month from a loaded export."""
+    # from now on I kick the numpy arrays, because I'm not used to it
+    clocks = {}
+    clocks['project'] = []
+    clocks['parents'] = []
+    clocks['start'] = []
+    clocks['end'] = []
+    clocks['hours'] = []
+    clocks['desc'] = []
+    # make date strings to datetime objects
+    # calculate hours from start and end clock (ISO)
+    for i in range(len(data['start'])):
+        start = datetime.strptime(data['start'][i].decode(enc),
+                                  '%Y-%m-%d %H:%M')
+        if start.year != month.year or start.month != month.month:
+            continue # skip entry that does not match the month
+        end = datetime.strptime(data['end'][i].decode(enc),
+                                '%Y-%m-%d %H:%M')
+        clocks['start'].append(start)
+        clocks['end'].append(end)
+        clocks['hours'].append((end - start).seconds/3600)
+        if data['parents'][i]:
+            clocks['project'].append(data['parents'][i].split(b'/', 1)[0])
+        else:
+            clocks['project'].append(data['task'][i]) # entry that has no parents
+        clocks['parents'].append(data['parents'][i]) # save all parents
+        clocks['desc'].append(data['task'][i]) # save description
+    return clocks
+
+def month_rows(lines, month):
+    """Rows (tuples of str) of a month from the lines (str) of an export,
+    the first line is the header. Returns the column names and the rows."""
+    prefix = "{:%Y-%m}".format(month)
+    reader = csv.reader(lines)
+    names = next(reader, [])
+    if 'start' not in names:
+        return names, []
+    col = names.index('start')
+    return names, [tuple(row) for row in reader
+                   if len(row) == len(names) and row[col].startswith(prefix)]
+
+def stream(patterns, month, index=False):
+    """Clock entries of a month read line by line from exports.
+
+    Only the rows of the month are kept (sorted by start like
+    orgclock.load()), entries found in more than one export are dropped
+    like in orgclock.merge(). With index, only the lines of the month are
+    read (see month_index.py). Returns the entries (start, hours, project,
+    parents, description) for aggregate().
+
+    """
+    import orgclock
+    rows, seen = [], {}
+    for k, filename in enumerate(orgclock.filenames(patterns)):
+        if index:
+            import month_index
+            with open(filename, 'rb') as f:
+                header = f.readline()
+            lines = [l.decode(enc) for l in
+                     [header] + month_index.lines(filename, month)]
+            names, res = month_rows(lines, month)
+        else:
+            with open(filename, 'r', encoding=enc, newline='') as f:
+                names, res = month_rows(f, month)
+        for row in res:
+            row = dict(zip(names, row))
+            key = tuple(sorted(row.items()))
+            if seen.setdefault(key, k) != k:
+                continue  # duplicate of another export
+            rows.append(row)
+    # ties are sorted by the other columns like numpy's sort(order='start')
+    rows.sort(key=lambda r: (r['start'],) + tuple(r.values()))
+    entries = []
+    for r in rows:
+        start = datetime.strptime(r['start'], '%Y-%m-%d %H:%M')
+        end = datetime.strptime(r['end'], '%Y-%m-%d %H:%M')
+        # entry that has no parents is its own project
+        project = r['parents'].split('/', 1)[0] if r['parents'] \
+            else r['task']
+        entries.append((start, (end - start).seconds/3600,
+                        project.encode(enc), r['parents'], r['task']))
+    return entries
 
 
 #
 # data preprocessing
 #
 
-# sort w.r.t. start datetime
-data.sort(order='start')
-
-def skip(entry):
-    # check if entry in month
-    dt = datetime.strptime(entry['start'].decode(enc),
-                           '%Y-%m-%d %H:%M')
-    if dt.year != args.month.year or dt.month != args.month.month:
-        return True # skip entry that does not match the month
-    # all checks passed
-    return False
-
-# from now on I kick the numpy arrays, because I'm not used to it
-clocks = {}
-clocks['project'] = []
-clocks['parents'] = []
-clocks['start'] = []
-clocks['end'] = []
-clocks['hours'] = []
-clocks['desc'] = []
-
-# make date strings to datetime objects
-# calculate hours from start and end clock (ISO)
-for i in range(len(data['start'])):
-    if skip(data[i]):
-        continue
-    start = datetime.strptime(data['start'][i].decode(enc),
-                              '%Y-%m-%d %H:%M')
-    end = datetime.strptime(data['end'][i].decode(enc),
-                            '%Y-%m-%d %H:%M')
-    clocks['start'].append(start)
-    clocks['end'].append(end)
-    clocks['hours'].append((end - start).seconds/3600)
-    if data['parents'][i]:
-        clocks['project'].append(data['parents'][i].split(b'/', 1)[0])
-    else:
-        clocks['project'].append(data['task'][i]) # entry that has no parents
-    clocks['parents'].append(data['parents'][i]) # save all parents
-    clocks['desc'].append(data['task'][i]) # save description
-
-topics = sorted(set(clocks['project']))
-
-# reduce clocks and description to days
-hpd = {}  # hours per day
-dpd = {}  # all topics description per day
-ppd = {}  # parents per day
-# each topic gets a hpd, dpd, ppd
-for t in topics:
-    hpd[t] = [0] * 31
-    dpd[t] = [None] * 31
-    ppd[t] = [None] * 31
-# collect to days
-dt = clocks['start'][0]
-try:
-    for i in range(len(clocks['start'])):
-        if clocks['start'][i].day != dt.day:
-            dt = clocks['start'][i]
-        hpd[clocks['project'][i]][dt.day-1] += clocks['hours'][i]
-        # create list for descriptions of the day
-        if dpd[clocks['project'][i]][dt.day-1] is None:
-            dpd[clocks['project'][i]][dt.day-1] = list()
-        dpd[clocks['project'][i]][dt.day-1].append(clocks['desc'][i].decode(enc))
-        # create list of parents per day
-        if ppd[clocks['project'][i]][dt.day-1] is None:
-            ppd[clocks['project'][i]][dt.day-1] = list()
-        ppd[clocks['project'][i]][dt.day-1].append(clocks['parents'][i].decode(enc))
-except Exception as e:
-    print(i, dt, clocks['hours'][i], clocks['desc'][i], clocks['parents'][i])
-    raise e
-
-def cat_description(date, project):
+def aggregate(entries, month):
+    """Sums up entries (start, hours, project, parents, description) per day
+    of the month and topic (project) in a single pass.
+
+    Only the (day, topic) pairs with entries are stored: hours, descriptions
+    and parents per day are keyed by (day of month, topic).
+
+    """
+    days = {}
+    days['dates'] = workcal.month_days(month.year, month.month)
+    hpd = days['hpd'] = {}  # hours per day
+    dpd = days['dpd'] = {}  # all topics description per day
+    ppd = days['ppd'] = {}  # parents per day
+    topics = set()
+    for start, hours, project, parents, desc in entries:
+        key = (start.day, project)
+        topics.add(project)
+        hpd[key] = hpd.get(key, 0) + hours
+        dpd.setdefault(key, []).append(desc)
+        ppd.setdefault(key, []).append(parents)
+    days['topics'] = sorted(topics)
+    return days
+
+def clock_entries(clocks):
+    """Entries of clocks (see read) for aggregate()."""
+    return zip(clocks['start'], clocks['hours'], clocks['project'],
+               [p.decode(enc) for p in clocks['parents']],
+               [d.decode(enc) for d in clocks['desc']])
+
+def parsed_entries(clocks):
+    """Entries of parsed clocks (see orgclock.parse) for aggregate()."""
+    return zip(clocks['start'].astype(datetime), clocks['hours'],
+               [bytes(h) for h in clocks['h1']],
+               [p.decode(enc) for p in clocks['parents']],
+               [t.decode(enc) for t in clocks['task']])
+
+def reduce_days(clocks, month=None):
+    """Reduces clocks (see read) and description to days (see aggregate).
+
+    The month defaults to the one of the first clock entry.
+
+    """
+    return aggregate(clock_entries(clocks), month or clocks['start'][0])
+
+def cat_description(days, date, project):
     # concatinate information to a single search string
+    dpd, ppd = days['dpd'], days['ppd']
     searchstr = ""
-    if dpd[project][date.day-1] is not None:
-        searchstr += ",".join(dpd[project][date.day-1])
+    if (date.day, project) in dpd:
+        searchstr += ",".join(dpd[date.day, project])
     searchstr += ","
-    if ppd[project][date.day-1] is not None:
-        searchstr += ",".join(ppd[project][date.day-1])
+    if (date.day, project) in ppd:
+        searchstr += ",".join(ppd[date.day, project])
     return searchstr
 
 # round up to 1/2h project (round down other)
-def clocks_phours(date, project, topics):
-    hours = hpd[project][date.day-1]
+def clocks_phours(days, date, project):
+    hours = days['hpd'].get((date.day, project), 0)
     # search lunch in topics
     had_lunch = False
-    for t in topics:
-        searchstr = cat_description(date, t)
+    for t in days['topics']:
+        searchstr = cat_description(days, date, t)
         if "Lunch" in searchstr or "lunch" in searchstr:
             had_lunch = True
     if had_lunch:
@@ -161,7 +235,8 @@ def clocks_phours(date, project, topics):
     hours = round(hours*2)/2
     return hours
 
-def clocks_other(date, project, topics):
+def clocks_other(days, date, project):
+    hpd, dpd = days['hpd'], days['dpd']
     # defaults
     ohours = 0
     ohours_max = 0
@@ -169,22 +244,23 @@ def clocks_other(date, project, topics):
     ahours = 0
     atopic = ""
     # sum up the hours of the topics
-    for t in topics:
+    for t in days['topics']:
         # ignore the project
         if project == t:
             continue
+        hours = hpd.get((date.day, t), 0)
         if "Absence" in t.decode(enc):
             # handle absence
             try:
-                atopic = dpd[t][date.day-1][0]
+                atopic = dpd[date.day, t][0]
             except:
                 atopic = ""
-            ahours += hpd[t][date.day-1]
+            ahours += hours
         else:
             # handle other
-            ohours += hpd[t][date.day-1]
-            if hpd[t][date.day-1] > ohours_max:
-                ohours_max = hpd[t][date.day-1]
+            ohours += hours
+            if hours > ohours_max:
+                ohours_max = hours
                 otopic_max = t.decode(enc)
     # round
     ohours = round(ohours*2)/2
@@ -192,15 +268,15 @@ def clocks_other(date, project, topics):
     return otopic_max, ohours, atopic, ahours
 
 # extract project work packages
-def clocks_wp(date, project):
+def clocks_wp(days, date, project, work_package=-1):
     # default
     wp = -1
     task = -1
     # default if project hours written on that day
-    if hpd[project][date.day-1] > 0:
-        wp = args.work_package
+    if days['hpd'].get((date.day, project), 0) > 0:
+        wp = work_package
     # search 'WP'
-    searchstr = cat_description(date, project)
+    searchstr = cat_description(days, date, project)
     if 'WP' in searchstr:
         i = searchstr.index('WP')
         try:
@@ -216,59 +292,23 @@ def clocks_wp(date, project):
 # print
 #
 
-def csv_begin():
-    header = ["Date", args.project, "WP", "Task", "ACT", "pHours",
-              "Other Activities", "oHours", "Absence", "aHours",
-              "Total"]
-    # csv
-    res = ";".join(header) + "\n"
-    return res
-
-def csv_end():
-    res = ""
-    return res
-
-def csv_row(row):
-    res = ";".join(row) + "\n"
-    return res
-
-def csv_clock_row(date, desc, wp, task=-1, act="", phours=8, other="", ohours=0,
-                  absence="", ahours=0, total=8):
-    row = [
-        "{:%Y-%m-%d %a}".format(date),
-        desc,
-        "{:d}".format(wp) if wp != -1 else "",
-        "{:d}".format(task) if task != -1 else "",
-        act,
-        "{:.1f}".format(phours) if phours > 0 else "",
-        other,
-        "{:.1f}".format(ohours) if ohours > 0 else "",
-        absence,
-        "{:.1f}".format(ahours) if ahours > 0 else "",
-        "{:.1f}".format(total)
-    ]
-    res = csv_row(row)
-    return res
-
-def csv_efforts():
-    res = ""
-    res += csv_begin()
-    # print efforts (a table row for each day)
-    dt = args.month.replace(day=1)  # reset to first day of month
-    project = args.project.encode(enc)
-    for i in range(len(hpd[topics[0]])):
+def clock_rows(days, month, project, work_package=-1):
+    """Values of the timesheet rows (a dict per day, see monthsheet.row)."""
+    # efforts (a table row for each day)
+    dpd = days['dpd']
+    project = project.encode(enc)
+    for dt in days['dates']:
         # hours
-        phours = clocks_phours(dt, project, topics)
+        phours = clocks_phours(days, dt, project)
         # get WP and task
-        wp, task = clocks_wp(dt, project)
+        wp, task = clocks_wp(days, dt, project, work_package)
         # description for project activity
         desc = ""
-        if dpd[project][i] is not None:
-            desc = ", ".join(set(dpd[project][i]))
+        if (dt.day, project) in dpd:
+            desc = ", ".join(set(dpd[dt.day, project]))
         # other columns
-        otopic, ohours, atopic, ahours = clocks_other(dt, project, topics)
-        # get latex representation
-        res += csv_clock_row(
+        otopic, ohours, atopic, ahours = clocks_other(days, dt, project)
+        yield dict(
             date=dt,
             desc=desc,
             wp=wp,
@@ -280,16 +320,61 @@ def csv_efforts():
             ahours=ahours,
             total=phours + ohours
         )
-        dt = dt + timedelta(days=1)  # next day
-    res += csv_end()
-    return res
+
+def timesheet(days, month, project, work_package=-1):
+    """Typed timesheet of the month (see monthsheet.py)."""
+    return monthsheet.timesheet(
+        project, clock_rows(days, month, project, work_package))
+
+def csv_efforts(days, month, project, work_package=-1):
+    """Timesheet of the month as csv text."""
+    res = io.StringIO()
+    monthsheet.write(timesheet(days, month, project, work_package), res)
+    return res.getvalue()
 
 
 #
 # output
 #
 
-with open("{:%Y-%m}.csv".format(args.month), 'w') as f:
-    s = csv_efforts()
-    f.write(s)
-    f.close()
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    import orgclock
+    if args.stream:
+        with stages.stage('parse') as s:
+            entries = stream(args.data, args.month, args.index)
+            s['rows'] = len(entries)
+    else:
+        with stages.stage('load') as s:
+            if args.index:
+                import functools
+                import month_index
+                data = orgclock.load_many(args.data, functools.partial(
+                    month_index.load, month=args.month))
+            else:
+                data = orgclock.load_many(args.data)
+            s['rows'] = len(data)
+        with stages.stage('parse') as s:
+            clocks = read(data, args.month)
+            entries = clock_entries(clocks)
+            s['rows'] = len(clocks['start'])
+    with stages.stage('aggregate') as s:
+        days = aggregate(entries, args.month)
+        s['rows'] = len(days['topics'])
+    if not days['topics']:
+        raise SystemExit("no clock entries in {:%Y-%m}".format(args.month))
+    with stages.stage('render'):
+        sheet = timesheet(days, args.month, args.project, args.work_package)
+    with stages.stage('write'):
+        with open("{:%Y-%m}.csv".format(args.month), 'w') as f:
+            monthsheet.write(sheet, f)
+    if args.check:
+        import csv_check
+        with stages.stage('check'):
+            csv_check.check(*csv_check.rows(sheet))
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
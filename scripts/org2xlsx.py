@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Generates monthly TUW timesheets as xlsx from org-mode csv exports.
+
+Like org2csv.py, but writes a workbook per person and month with a title row,
+an empty row and the timesheet table (columns Date, <project>, WP, Task, ACT,
+Hours, Other Activities, oHours, Absence, aHours, Total), i.e., the layout
+read by xlsx_wp_summary.py (with the default --skip 2). The workbooks are
+streamed to disk row by row. The exports of a person are loaded once for all
+months and released before the next person's are loaded.
+"""
+
+def valid_month(s):
+    try:
+        return datetime.strptime(s, "%Y-%m")
+    except ValueError:
+        msg = "Not a valid date: '{0}'.".format(s)
+        raise argparse.ArgumentTypeError(msg)
+
+def valid_person(s):
+    person, sep, data = s.partition('=')
+    if not sep:
+        person, data = os.path.splitext(os.path.basename(s))[0], s
+    return person, data
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('data', type=valid_person, nargs='+',
+                    help="""Inputs, csv files exported via org-clock-csv (or
+                    glob patterns), optionally prefixed with the person (e.g.,
+                    'alice=data/alice-*.csv'). Default person: file name
+                    without extension.""")
+parser.add_argument('-m', '--months', type=valid_month, nargs='+',
+                    default=[datetime.today()],
+                    help="""Months in format 'YYYY-MM', e.g.,
+                    '2017-07'. Default: this month.""")
+parser.add_argument('-p', '--project', type=str, required=True,
+                    help="""Project for which the timesheets shall be
+                    generated. All other hours will be summed up.""")
+parser.add_argument('-w', '--work-package', type=int, default=-1,
+                    help="""Default work package (will be used if no work
+                    package can be found in the description of the clock
+                    entries).""")
+parser.add_argument('-o', '--output', type=str, default="{month}.xlsx",
+                    help="""Output file name, '{person}' and '{month}'
+                    (YYYY-MM) are replaced. Default: '{month}.xlsx'.""")
+instrument.add_arguments(parser)
+
+
+#
+# xlsx
+#
+
+HEADER = ["Date", None, "WP", "Task", "ACT", "Hours", "Other Activities",
+          "oHours", "Absence", "aHours", "Total"]
+
+def xlsx_row(ws, date, desc, wp, task=-1, act="", phours=8, other="",
+             ohours=0, absence="", ahours=0, total=8):
+    """Cells of a day (empty values like in the csv)."""
+    from openpyxl.cell import WriteOnlyCell
+    date = WriteOnlyCell(ws, value=date)
+    date.number_format = 'yyyy-mm-dd ddd'
+    return [
+        date,
+        desc or None,
+        wp if wp != -1 else None,
+        task if task != -1 else None,
+        act or None,
+        phours if phours > 0 else None,
+        other or None,
+        ohours if ohours > 0 else None,
+        absence or None,
+        ahours if ahours > 0 else None,
+        total,
+    ]
+
+def xlsx_efforts(filename, rows, month, project, person=""):
+    """Streams the timesheet rows (see org2csv.clock_rows) to a workbook."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("{:%Y-%m}".format(month))
+    ws.append(["Timesheet", person, project, "{:%Y-%m}".format(month)])
+    ws.append([])
+    ws.append([project if h is None else h for h in HEADER])
+    for row in rows:
+        ws.append(xlsx_row(ws, **row))
+    wb.save(filename)
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    if len(args.data) > 1 and '{person}' not in args.output:
+        parser.error("--output needs '{person}' for several persons")
+
+    import org2csv
+    import orgclock
+
+    # one person and one workbook at a time, an export is released before
+    # the next one is loaded
+    with stages.stage('write') as s:
+        s['rows'] = 0
+        for person, patterns in args.data:
+            data = orgclock.load_many(patterns)
+            for month in args.months:
+                clocks = org2csv.read(data, month)
+                # like org2csv.py, months without project hours are written
+                if len(clocks['start']) == 0:
+                    print("[WARN ] no clock entries of {} in {:%Y-%m}"
+                          .format(person, month), file=sys.stderr)
+                    continue
+                days = org2csv.reduce_days(clocks, month)
+                filename = args.output.format(
+                    person=person, month="{:%Y-%m}".format(month))
+                xlsx_efforts(filename, org2csv.clock_rows(
+                    days, month, args.project, args.work_package),
+                             month, args.project, person)
+                s['rows'] += 1
+                print(filename)
+            del data
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
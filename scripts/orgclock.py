@@ -0,0 +1,199 @@
+"""Reads clock entries exported via org-clock-csv.
+
+Shared by the scripts that work on the raw clock export (not on the monthly
+timesheet csv).
+"""
+
+import glob
+import heapq
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib import recfunctions
+
+
+#
+# config
+#
+
+enc = 'utf-8'
+
+
+#
+# read data
+#
+
+def load(filename, lines=None):
+    """Loads an org-clock-csv export into a numpy array sorted by start.
+
+    If lines (bytes, without the header) are given, only these are parsed,
+    e.g., the ones of a month (see month_index.py).
+
+    """
+    # read column names (1st line in csv)
+    with open(filename, 'r') as f:
+        names = f.readline().strip().split(',')
+        if lines is None and not f.readline():
+            lines = []  # header only
+    # unfortunately very restricting, error when no str length is given :(
+    dtype = [(n, 'S100') for n in names]
+    # load into numpy array
+    if lines is None:
+        data = np.genfromtxt(filename, delimiter=',', dtype=dtype,
+                             invalid_raise=False, skip_header=1)
+    elif lines:
+        data = np.genfromtxt(lines, delimiter=',', dtype=dtype,
+                             invalid_raise=False)
+    else:
+        data = np.zeros(0, dtype=dtype)
+    data = np.atleast_1d(data)
+    # sort w.r.t. start datetime
+    data.sort(order='start')
+    return data
+
+def filenames(patterns):
+    """Expands glob patterns (a pattern without match is kept as is)."""
+    res = []
+    for p in [patterns] if isinstance(patterns, str) else patterns:
+        for f in sorted(glob.glob(p)) or [p]:
+            if f not in res:
+                res.append(f)
+    return res
+
+def merge(arrays):
+    """Merges loaded exports (each sorted by start) into one sorted by start.
+
+    Entries found in more than one export (equal in all common columns) are
+    kept only once.
+
+    """
+    names = [n for n in arrays[0].dtype.names
+             if all(n in a.dtype.names for a in arrays)]
+    arrays = [recfunctions.repack_fields(a[names]) for a in arrays]
+    offsets = np.cumsum([0] + [len(a) for a in arrays])
+    # k-way merge on start, duplicates have the same start
+    keep = []
+    start, seen = None, {}  # entry -> export of the entries of start
+    runs = [zip(a['start'], [k]*len(a), range(len(a)))
+            for k, a in enumerate(arrays)]
+    for s, k, i in heapq.merge(*runs):
+        if s != start:
+            start, seen = s, {}
+        entry = arrays[k][i].tobytes()
+        if seen.setdefault(entry, k) != k:
+            continue  # duplicate of another export
+        keep.append(offsets[k] + i)
+    return np.concatenate(arrays)[np.array(keep, dtype=int)]
+
+def load_many(patterns, loader=load, jobs=None):
+    """Loads and merges several exports (see merge()), glob patterns are
+    expanded. The exports are loaded in parallel with loader(filename)."""
+    files = filenames(patterns)
+    if len(files) == 1:
+        return loader(files[0])
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return merge(list(pool.map(loader, files)))
+
+
+#
+# columns
+#
+
+def to_datetime64(column):
+    """Converts ISO date strings ('YYYY-MM-DD HH:MM') to datetime64[m]."""
+    return column.astype('U16').astype('datetime64[m]')
+
+def hours(data):
+    """Hours per clock entry (calculated from start and end clock)."""
+    minutes = (to_datetime64(data['end'])
+               - to_datetime64(data['start'])).astype(int)
+    # like timedelta.seconds, i.e., days are dropped
+    return (minutes % (24*60)) / 60
+
+def days(data):
+    """Day of the start clock per entry as datetime64[D]."""
+    return to_datetime64(data['start']).astype('datetime64[D]')
+
+def h1(data):
+    """Main headline per entry (the task itself if it has no parents)."""
+    if len(data) == 0:
+        return np.array([], dtype='S100')  # partition() would be 1-d
+    heads = np.char.partition(data['parents'], b'/')[:, 0]
+    return np.where(heads == b'', data['task'], heads)
+
+
+#
+# parsed clocks
+#
+
+def parse(data):
+    """Converts an export to typed columns (dict of arrays).
+
+    Entries without valid start or end clock are dropped. The result can be
+    filtered with select() any number of times without parsing again.
+
+    """
+    start = to_datetime64(data['start'])
+    end = to_datetime64(data['end'])
+    valid = ~np.isnat(start) & ~np.isnat(end)
+    data = data[valid]
+    return {
+        'start': start[valid],
+        'end': end[valid],
+        'hours': hours(data),
+        'h1': h1(data),
+        'parents': data['parents'],
+        'task': data['task'],
+    }
+
+def work_packages(clocks):
+    """Work package and its task per entry (-1 if not given).
+
+    Like the monthly timesheet, the first 'WP<n>[.<m>]' in the task or its
+    parents is used.
+
+    """
+    pattern = re.compile(rb'WP(\d)(?:\.(\d))?')
+    texts, idx = np.unique(np.char.add(np.char.add(clocks['task'], b','),
+                                       clocks['parents']),
+                           return_inverse=True)
+    wps = np.full((len(texts), 2), -1)
+    for i, text in enumerate(texts):
+        m = pattern.search(text)
+        if m:
+            wps[i] = int(m.group(1)), int(m.group(2) or -1)
+    return wps[idx, 0], wps[idx, 1]
+
+def read(patterns):
+    """Parsed clocks of exports (see load_many()) or of a columnar file (see
+    columnar.py)."""
+    import columnar
+    files = filenames(patterns)
+    if any(columnar.is_columnar(f) for f in files):
+        if len(files) > 1:
+            raise SystemExit("columnar files cannot be merged with other "
+                             "exports")
+        return columnar.read(files[0])
+    return parse(load_many(files))
+
+def select(clocks, range_from=None, range_to=None, projects=None):
+    """Filters parsed clocks.
+
+    range_from and range_to are ISO dates (e.g., '2018-01' or '2018-01-15'),
+    the end of the range is exclusive. An entry matches the projects if one
+    of them is part of its parents.
+
+    """
+    mask = np.ones(len(clocks['start']), dtype=bool)
+    if range_from:
+        mask &= clocks['start'] >= np.datetime64(range_from, 'm')
+    if range_to:
+        mask &= clocks['start'] < np.datetime64(range_to, 'm')
+    if projects:
+        in_projects = np.zeros(len(mask), dtype=bool)
+        for p in projects:
+            in_projects |= np.char.find(clocks['parents'],
+                                        p.encode(enc)) >= 0
+        mask &= in_projects
+    return {k: v[mask] for k, v in clocks.items()}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Exports the plots listed in a spec file (json) in a single run.
+
+Each export is parsed only once, the plots are drawn with a non-interactive
+backend into one figure per plot type that is cleared and reused.
+
+Example spec file:
+{
+  "data": "data/clocks.csv",
+  "plots": [
+    {"plot": "heatmap", "export": "heatmap.png", "projects": ["IoT4CPS"]},
+    {"plot": "heatmap", "export": "heatmap.svg", "native": true},
+    {"plot": "h1", "export": "h1.png", "resolution": "m", "stack": true,
+     "from": "2018-01", "to": "2019-01"}
+  ]
+}
+
+Keys of a plot are the long options of plot_heatmap.py ('heatmap') and
+plot_hours_per_h1.py ('h1'). Keys on the top level are defaults for all
+plots. The data may be a list of exports or glob patterns (merged).
+"""
+
+parser = argparse.ArgumentParser(
+    description=desc, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('spec', type=str,
+                    help="""Spec file (json) listing the plots.""")
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help="""Number of worker processes. Default: 1 (export
+                    all plots in this process).""")
+instrument.add_arguments(parser)
+
+FIGSIZE = {
+    'heatmap': (10, 2),
+    'h1': (10, 12),
+}
+
+
+#
+# caches (per process)
+#
+
+parsed = {}  # parsed clocks per export
+figures = {}  # figure per plot type
+
+def init(clocks):
+    """Initializes a worker with the clocks parsed by the main process."""
+    parsed.update(clocks)
+
+def pool(jobs):
+    """Workers that share the parsed clocks: forked if fork is the default
+    start method of the platform, otherwise (e.g., spawn on macOS and
+    Windows, forkserver from Python 3.14) they get a copy on start."""
+    if multiprocessing.get_start_method() == 'fork':
+        return ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context('fork'))
+    return ProcessPoolExecutor(max_workers=jobs, initializer=init,
+                               initargs=(parsed,))
+
+def clocks_of(data):
+    """Parsed clocks of an export, a glob pattern or a list of them."""
+    import orgclock
+    key = data if isinstance(data, str) else tuple(data)
+    if key not in parsed:
+        parsed[key] = orgclock.read(data)
+    return parsed[key]
+
+def figure(plot):
+    if plot not in figures:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        figures[plot] = plt.figure(figsize=FIGSIZE[plot])
+    fig = figures[plot]
+    fig.clf()
+    return fig
+
+
+#
+# export
+#
+
+def export(spec):
+    """Exports a single plot, returns the filename or None if empty."""
+    import efforts
+    import heatmap
+    import orgclock
+    if spec['plot'] == 'heatmap':
+        clocks = orgclock.select(clocks_of(spec['data']), spec.get('from'),
+                                 spec.get('to'), spec.get('projects'))
+        if len(clocks['start']) == 0:
+            return None
+        x, bins, dt0, dt1 = heatmap.efforts(clocks['start'], clocks['hours'])
+        xticks, xlabels = heatmap.month_ticks(dt0, dt1)
+        if spec.get('native'):
+            heatmap.export(spec['export'], x, bins, xticks, xlabels)
+            return spec['export']
+        fig = figure('heatmap')
+        heatmap.plot(fig, x, bins, xticks, xlabels)
+    elif spec['plot'] == 'h1':
+        clocks = orgclock.select(clocks_of(spec['data']), spec.get('from'),
+                                 spec.get('to'))
+        if len(clocks['start']) == 0:
+            return None
+        projects = efforts.projects(clocks, spec.get('projects'))
+        bins = efforts.efforts(clocks, projects, spec.get('resolution'))
+        fig = figure('h1')
+        efforts.plot(fig, bins, projects, spec.get('resolution'),
+                     clocks['start'][0].astype(datetime),
+                     spec.get('stack', False))
+    else:
+        raise ValueError("unknown plot type '{}'".format(spec['plot']))
+    fig.savefig(spec['export'])
+    return spec['export']
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    defaults = {k: v for k, v in spec.items() if k != 'plots'}
+    plots = [dict(defaults, **p) for p in spec['plots']]
+
+    # parse once before starting the workers, see pool()
+    with stages.stage('parse') as s:
+        for p in plots:
+            clocks_of(p['data'])
+        s['rows'] = sum(len(c['start']) for c in parsed.values())
+
+    with stages.stage('export') as s:
+        if args.jobs > 1:
+            with pool(args.jobs) as workers:
+                exported = list(workers.map(export, plots))
+        else:
+            exported = [export(p) for p in plots]
+        s['rows'] = len(plots)
+
+    for p, e in zip(plots, exported):
+        if e is None:
+            print("[WARN ] no clock entries for '{}'".format(p['export']),
+                  file=sys.stderr)
+    stages.report()
+
+
+if __name__ == '__main__':
+    main()
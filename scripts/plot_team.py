@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import argparse
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Plots the hours of a team: one heatmap per member stacked below the
+team's heatmap (average hours per member) and prints the hours per member and
+project.
+
+The exports of each member are aggregated to hours per project and day in
+parallel, the team totals are the sum of these. The hours per week of a
+member are averaged over the member's own range (first to last clock entry
+within --from/--to), the column 'vs. median' compares them with the median of
+the members with clock entries.
+"""
+
+def valid_member(s):
+    person, sep, data = s.partition('=')
+    if not sep:
+        person, data = os.path.splitext(os.path.basename(s))[0], s
+    return person, data
+
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('members', type=valid_member, nargs='+',
+                    help="""Exports of the members (csv files exported via
+                    org-clock-csv, glob patterns or columnar clocks files),
+                    optionally prefixed with the person (e.g.,
+                    'alice=data/alice-*.csv'). Default person: file name
+                    without extension.""")
+parser.add_argument('-p', '--projects', type=str, nargs='+',
+                    help="""Projects to include. The 'parents' column of the
+                    org-clock-csv export will be searched.""")
+parser.add_argument('-f', '--from', dest='range_from', type=str,
+                    help="""Start date (e.g., '2018-01' or '2018-01-15').""")
+parser.add_argument('-t', '--to', dest='range_to', type=str,
+                    help="""End date (exclusive).""")
+parser.add_argument('-w', '--weekly', type=str,
+                    help="""Write the team's hours per project and week to a
+                    csv file.""")
+parser.add_argument('-j', '--jobs', type=int,
+                    help="""Number of worker processes. Default: number of
+                    CPUs.""")
+parser.add_argument('-e', '--export', type=str,
+                    help="Export to file.")
+instrument.add_arguments(parser)
+
+
+#
+# output
+#
+
+def print_breakdown(names, result):
+    """Hours per member and project, total and hours per week (over the
+    member's range, see team.reduce)."""
+    import numpy as np
+    import orgclock
+    projects = [p.decode(orgclock.enc) for p in result['projects']]
+    totals = result['breakdown'].sum(axis=1)
+    active = result['spans'] > 0
+    per_week = totals / np.maximum(result['spans'] / 7, 1)
+    median = np.median(per_week[active]) if active.any() else 0
+    width = max([len(p) for p in projects] + [8])
+    print(("{:12}" + " {:>{w}}"*(len(projects) + 3)).format(
+        "member", *projects, "total", "h/week", "vs. median", w=width))
+    for name, hours, total, pw, span in zip(names, result['breakdown'],
+                                            totals, per_week,
+                                            result['spans']):
+        change = "{:+.0%}".format(pw / median - 1) \
+            if median and span else ""
+        print(("{:12}" + " {:{w}.1f}"*(len(projects) + 2) + " {:>{w}}")
+              .format(name, *hours, total, pw, change, w=width))
+
+def write_weekly(filename, projects, mondays, hours):
+    import orgclock
+    with open(filename, 'w') as f:
+        f.write(";".join(["Week"] + [p.decode(orgclock.enc)
+                                     for p in projects] + ["Total"]) + "\n")
+        for i, monday in enumerate(mondays):
+            f.write(";".join([str(monday)] + ["{:.2f}".format(h) for h in
+                                              hours[:, i]]
+                             + ["{:.2f}".format(hours[:, i].sum())]) + "\n")
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+
+    import heatmap
+    import team
+
+    names = [person for person, _ in args.members]
+
+    #
+    # aggregate per member (in parallel) and reduce
+    #
+
+    with stages.stage('aggregate') as s:
+        daily = functools.partial(team.daily, range_from=args.range_from,
+                                  range_to=args.range_to,
+                                  projects=args.projects)
+        exports = [data for _, data in args.members]
+        if len(exports) > 1 and args.jobs != 1:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                members = list(pool.map(daily, exports))
+        else:
+            members = [daily(d) for d in exports]
+        s['rows'] = len(members)
+
+    with stages.stage('reduce'):
+        result = team.reduce(members)
+        days = result['days']
+        if len(days) == 0:
+            raise SystemExit("no clock entries to plot")
+        mondays, weekly = team.weekly(days, result['team'])
+
+    #
+    # output
+    #
+
+    with stages.stage('render'):
+        print_breakdown(names, result)
+        if args.weekly:
+            write_weekly(args.weekly, result['projects'], mondays, weekly)
+
+        import matplotlib.pyplot as plt
+
+        panels = [("Team (average per member)",
+                   result['team'].sum(axis=0) / len(names))]
+        panels += list(zip(names, result['members']))
+        fig = plt.figure(figsize=(10, 2*len(panels)))
+        for i, (title, hours) in enumerate(panels):
+            x, bins, dt0, dt1 = heatmap.efforts(days, hours)
+            xticks, xlabels = heatmap.month_ticks(dt0, dt1)
+            heatmap.plot(fig, x, bins, xticks, xlabels, title,
+                         subplot=(len(panels), 1, i + 1))
+        fig.tight_layout()
+
+        if args.export:
+            fig.savefig(args.export)
+    stages.report()
+
+    if not args.export:
+        plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import io
+import os
+import string
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import instrument
+
+
+#
+# config
+#
+
+desc = """Serves monthly timesheets, checks, WP summaries, heatmaps and latex
+timesheets of org-clock-csv exports via HTTP.
+
+The exports are loaded once and kept in memory (reloaded when the file
+changes). Results are cached (least recently used are evicted first) and keyed
+by person, project, month and the hash of the export.
+
+Requests (project via '?project=...'):
+  /                                     list of persons
+  /<person>/<YYYY-MM>/timesheet.csv     monthly timesheet (org2csv), '&wp=N'
+  /<person>/<YYYY-MM>/check             check report (csv_check)
+  /<person>/<YYYY-MM>/wp-summary        hours per WP and task (csv2tex)
+  /<person>/<YYYY-MM>/timesheet.tex     latex timesheet (csv2tex), '&name=..'
+  /<person>/heatmap.svg, heatmap.png    heatmap, '&from=..&to=..' optional
+"""
+
+def valid_source(s):
+    person, sep, filename = s.rpartition('=')
+    if not sep:
+        person = os.path.splitext(os.path.basename(filename))[0]
+    if not os.path.exists(filename):
+        raise argparse.ArgumentTypeError("No such file: '{}'.".format(filename))
+    return person, filename
+
+parser = argparse.ArgumentParser(
+    description=desc, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('data', type=valid_source, nargs='+',
+                    help="""Inputs, csv files exported via org-clock-csv,
+                    optionally prefixed with the person (e.g.,
+                    'alice=data/alice.csv'). Default person: file name
+                    without extension.""")
+parser.add_argument('--host', type=str, default="127.0.0.1",
+                    help="""Address to listen on. Default: 127.0.0.1""")
+parser.add_argument('--port', type=int, default=8000,
+                    help="""Port to listen on. Default: 8000""")
+parser.add_argument('--cache-size', type=float, default=64,
+                    help="""Maximum size of the cached results in MB.
+                    Default: 64""")
+parser.add_argument('-t', '--template', type=str,
+                    default="{}/templates/timesheet.tex".format(os.getcwd()),
+                    help="""Latex template file for the timesheet.tex
+                    requests.""")
+instrument.add_arguments(parser)
+
+
+#
+# cache
+#
+
+class LRUCache:
+    """Results (bytes or objects of a given size) by key, evicts the least
+    recently used ones when the total size exceeds max_bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value, size=None):
+        """Caches value (kind, result), size defaults to len(result)."""
+        if size is None:
+            size = len(value[1])
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+                self.size -= self.sizes.pop(key)
+            if size > self.max_bytes:
+                return  # would evict everything else
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.size += size
+            while self.size > self.max_bytes:
+                old, _ = self.entries.popitem(last=False)
+                self.size -= self.sizes.pop(old)
+
+
+#
+# sources
+#
+
+class Source:
+    """An org-clock-csv export kept in memory."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.stat = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Returns (hash, parsed clocks), reloads if the file has changed."""
+        import orgclock
+        with self.lock:
+            st = os.stat(self.filename)
+            stat = (st.st_size, st.st_mtime_ns)
+            if stat != self.stat:
+                with open(self.filename, 'rb') as f:
+                    self.hash = hashlib.sha1(f.read()).hexdigest()
+                self.clocks = orgclock.parse(orgclock.load(self.filename))
+                self.stat = stat
+            return self.hash, self.clocks
+
+
+#
+# results
+#
+
+class NotFound(Exception):
+    pass
+
+def timesheet(clocks, month, project, wp=-1):
+    """Typed monthly timesheet (see monthsheet.py) shared by the results,
+    aggregated from the parsed clocks of the month."""
+    import numpy as np
+    import org2csv
+    import orgclock
+    first = np.datetime64("{:%Y-%m}".format(month), 'M')
+    clocks = orgclock.select(clocks, first, first + 1)
+    if len(clocks['start']) == 0:
+        raise NotFound("no clock entries in {:%Y-%m}".format(month))
+    days = org2csv.aggregate(org2csv.parsed_entries(clocks), month)
+    if project.encode(org2csv.enc) not in days['topics']:
+        raise NotFound("no clock entries for '{}' in {:%Y-%m}".format(
+            project, month))
+    return org2csv.timesheet(days, month, project, wp)
+
+def timesheet_csv(sheet):
+    import monthsheet
+    res = io.StringIO()
+    monthsheet.write(sheet, res)
+    return res.getvalue()
+
+def check_report(sheet):
+    import csv_check
+    res = io.StringIO()
+    csv_check.check(*csv_check.rows(sheet), file=res)
+    return res.getvalue()
+
+def tex(sheet, template, name=""):
+    """Returns the latex timesheet and the WP summary."""
+    import csv2tex
+    summary = {}
+    # the warnings are served by the check request, not logged
+    warnings = io.StringIO()
+    with open(template, 'r') as f:
+        res = string.Template(f.read()).substitute({
+            'name': name,
+            'efforts': csv2tex.tex_efforts(sheet, summary, file=warnings),
+        })
+    wps = io.StringIO()
+    csv2tex.print_summary(summary, file=wps)
+    return res, wps.getvalue()
+
+def heatmap_image(clocks, fmt, project=None, range_from=None, range_to=None):
+    import heatmap
+    import orgclock
+    clocks = orgclock.select(clocks, range_from, range_to,
+                             [project] if project else None)
+    if len(clocks['start']) == 0:
+        raise NotFound("no clock entries to plot")
+    x, bins, dt0, dt1 = heatmap.efforts(clocks['start'], clocks['hours'])
+    xticks, xlabels = heatmap.month_ticks(dt0, dt1)
+    if fmt == 'png':
+        return heatmap.png(heatmap.raster(x, bins, xticks, xlabels))
+    return heatmap.svg(x, bins, xticks, xlabels).encode('utf-8')
+
+
+#
+# server
+#
+
+CONTENT_TYPES = {
+    'timesheet.csv': 'text/csv; charset=utf-8',
+    'check': 'text/plain; charset=utf-8',
+    'wp-summary': 'text/plain; charset=utf-8',
+    'timesheet.tex': 'application/x-tex; charset=utf-8',
+    'heatmap.svg': 'image/svg+xml',
+    'heatmap.png': 'image/png',
+}
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers the requests, see the description of the server."""
+
+    sources = {}  # person -> Source
+    cache = None  # LRUCache
+    template = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split('/') if p]
+        try:
+            if not parts:
+                body = "\n".join(sorted(self.sources)) + "\n"
+                self.reply(200, 'text/plain; charset=utf-8',
+                           body.encode('utf-8'))
+                return
+            if parts[0] not in self.sources:
+                raise NotFound("unknown person '{}'".format(parts[0]))
+            if len(parts) == 2 and parts[1] in ('heatmap.svg', 'heatmap.png'):
+                month, kind = None, parts[1]
+            elif len(parts) == 3 and parts[2] in CONTENT_TYPES:
+                month, kind = parts[1], parts[2]
+                try:
+                    month = datetime.strptime(month, "%Y-%m")
+                except ValueError:
+                    raise ValueError("not a valid month: '{}'".format(month))
+            else:
+                raise NotFound("unknown request '{}'".format(url.path))
+            body = self.result(parts[0], month, kind, query)
+            self.reply(200, CONTENT_TYPES[kind], body)
+        except NotFound as e:
+            self.reply(404, 'text/plain', str(e).encode('utf-8'))
+        except (KeyError, ValueError) as e:
+            self.reply(400, 'text/plain', str(e).encode('utf-8'))
+        except Exception as e:
+            self.log_error("%s: %s", type(e).__name__, e)
+            self.reply(500, 'text/plain', str(e).encode('utf-8'))
+
+    def result(self, person, month, kind, query):
+        """Cached result of a request (bytes)."""
+        hash, clocks = self.sources[person].get()
+        project = query.get('project')
+        options = tuple(sorted((k, v) for k, v in query.items()
+                               if k != 'project'))
+        key = (person, project, month, hash, kind, options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached[1]
+        if kind.startswith('heatmap'):
+            body = heatmap_image(clocks, kind.split('.')[1], project,
+                                 query.get('from'), query.get('to'))
+        else:
+            if not project:
+                raise ValueError("missing parameter 'project'")
+            sheet = self.timesheet(person, hash, clocks, month, project,
+                                   int(query.get('wp', -1)))
+            if kind == 'timesheet.csv':
+                body = timesheet_csv(sheet)
+            elif kind == 'check':
+                body = check_report(sheet)
+            else:
+                res, wps = tex(sheet, self.template, query.get('name', ""))
+                body = res if kind == 'timesheet.tex' else wps
+            body = body.encode('utf-8')
+        self.cache.put(key, (kind, body))
+        return body
+
+    def timesheet(self, person, hash, clocks, month, project, wp):
+        """Typed monthly timesheet shared by the results, i.e., converted
+        once and passed to check and render without a csv round trip."""
+        key = (person, project, month, hash, 'timesheet', wp)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached[1]
+        sheet = timesheet(clocks, month, project, wp)
+        # about the size of the csv
+        size = sum(len(str(v)) + 1 for r in sheet['rows'] for v in r)
+        self.cache.put(key, ('timesheet', sheet), size)
+        return sheet
+
+    def reply(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+    Handler.sources = {person: Source(f) for person, f in args.data}
+    Handler.cache = LRUCache(int(args.cache_size * 1024 * 1024))
+    Handler.template = args.template
+    # load the exports before the first request
+    with stages.stage('load') as s:
+        for source in Handler.sources.values():
+            source.get()
+        s['rows'] = sum(len(src.clocks['start'])
+                        for src in Handler.sources.values())
+    stages.report()
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print("Serving {} on http://{}:{}/".format(
+        ", ".join(sorted(Handler.sources)), args.host, args.port),
+        file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
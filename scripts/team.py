@@ -0,0 +1,103 @@
+"""Hours per project (main headline) and day of a team.
+
+Used by plot_team.py. Each member's exports are binned into a matrix of hours
+per project and day (in a worker process per member). The team totals are
+the sum of these matrices aligned to common projects and days, i.e., the
+clock entries of the members are never concatenated.
+"""
+
+import numpy as np
+
+import orgclock
+
+
+#
+# per member
+#
+
+def daily(data, range_from=None, range_to=None, projects=None):
+    """Hours per project and day of a member.
+
+    data are the member's exports (see orgclock.read()). Returns the projects
+    (h1, sorted), the first day (datetime64[D], None without entries) and
+    the hours (projects x days).
+
+    """
+    clocks = orgclock.select(orgclock.read(data), range_from, range_to,
+                             projects)
+    if len(clocks['start']) == 0:
+        return np.array([], dtype='S100'), None, np.zeros((0, 0))
+    days = clocks['start'].astype('datetime64[D]')
+    names, p = np.unique(clocks['h1'], return_inverse=True)
+    d = (days - days[0]).astype(int)
+    hours = np.zeros((len(names), d[-1] + 1))
+    np.add.at(hours, (p, d), clocks['hours'])
+    return names, days[0], hours
+
+
+#
+# team
+#
+
+def reduce(members):
+    """Sums up the daily hours of the members (list of daily() results).
+
+    Returns a dict with the projects, the days (datetime64[D]), the team's
+    hours per project and day ('team'), the hours per member and day
+    ('members'), the hours per member and project ('breakdown') and the
+    number of days from the first to the last entry of each member ('spans').
+
+    """
+    present = [m for m in members if m[1] is not None]
+    projects = np.unique(np.concatenate(
+        [m[0] for m in members] + [np.array([], dtype='S100')]))
+    if not present:
+        return {
+            'projects': projects,
+            'days': np.array([], dtype='datetime64[D]'),
+            'team': np.zeros((len(projects), 0)),
+            'members': np.zeros((len(members), 0)),
+            'breakdown': np.zeros((len(members), len(projects))),
+            'spans': np.zeros(len(members), dtype=int),
+        }
+    first = min(m[1] for m in present)
+    last = max(m[1] + m[2].shape[1] for m in present)
+    days = np.arange(first, last)
+    team = np.zeros((len(projects), len(days)))
+    per_member = np.zeros((len(members), len(days)))
+    breakdown = np.zeros((len(members), len(projects)))
+    spans = np.zeros(len(members), dtype=int)
+    for i, (names, day0, hours) in enumerate(members):
+        if day0 is None:
+            continue
+        rows = np.searchsorted(projects, names)
+        cols = slice((day0 - first).astype(int),
+                     (day0 - first).astype(int) + hours.shape[1])
+        team[rows, cols] += hours
+        per_member[i, cols] = hours.sum(axis=0)
+        breakdown[i, rows] = hours.sum(axis=1)
+        spans[i] = hours.shape[1]
+    return {
+        'projects': projects,
+        'days': days,
+        'team': team,
+        'members': per_member,
+        'breakdown': breakdown,
+        'spans': spans,
+    }
+
+def weekly(days, hours):
+    """Sums up daily hours (... x days, consecutive days) per week (starting
+    on Monday).
+
+    Returns the Mondays (datetime64[D]) and the hours (... x weeks).
+
+    """
+    if len(days) == 0:
+        return days, np.zeros(hours.shape[:-1] + (0,))
+    weekday = (days.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    first = np.flatnonzero(weekday == 0)
+    if len(first) == 0 or first[0] != 0:
+        first = np.concatenate([[0], first])
+    mondays = days[first] - weekday[first].astype('timedelta64[D]')
+    return mondays, np.add.reduceat(hours, first, axis=-1)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+
+
+#
+# config
+#
+
+# subcommand -> (script, short description)
+COMMANDS = {
+    'convert': ('org2csv', "monthly timesheet (csv) from an org-clock-csv"),
+    'xlsx': ('org2xlsx', "monthly timesheets (xlsx) from org-clock-csvs"),
+    'check': ('csv_check', "check a monthly timesheet (csv) for errors"),
+    'tex': ('csv2tex', "monthly timesheet (latex) from a csv"),
+    'heatmap': ('plot_heatmap', "heatmap of the hours per weekday"),
+    'plot': ('plot_hours_per_h1', "hours per main headline over time"),
+    'team': ('plot_team', "team heatmaps and hours per member"),
+    'wp-summary': ('xlsx_wp_summary', "hours per WP and task of a xlsx"),
+    'index': ('hours_index', "hours of a date range (prefix-sum index)"),
+    'ledger': ('ledger', "flexitime balance across months"),
+    'batch': ('plot_batch', "export the plots of a spec file"),
+    'export': ('export_columnar', "columnar clocks (parquet, arrow)"),
+    'generate': ('gen_clocks', "synthetic org-clock-csv export"),
+    'serve': ('serve', "HTTP server for timesheets and plots"),
+}
+
+desc = """Timesheets and statistics from org-mode clocks.
+
+Each subcommand runs one of the scripts and accepts the same arguments (see
+'timesheet <command> -h'). Heavy dependencies (numpy, pandas, matplotlib) are
+only imported by the subcommands that need them.
+
+commands:
+""" + "\n".join("  {:12} {}".format(c, d) for c, (_, d) in COMMANDS.items())
+
+parser = argparse.ArgumentParser(
+    prog='timesheet', description=desc,
+    formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('command', choices=COMMANDS, metavar='command',
+                    help="""Subcommand, one of: {}.""".format(
+                        ", ".join(COMMANDS)))
+parser.add_argument('args', nargs=argparse.REMAINDER,
+                    help="""Arguments of the subcommand.""")
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    script = importlib.import_module(COMMANDS[args.command][0])
+    script.parser.prog = "timesheet " + args.command
+    script.main(args.args)
+
+
+if __name__ == '__main__':
+    main()
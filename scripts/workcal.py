@@ -0,0 +1,107 @@
+"""Working calendar: weekdays, weekends, Austrian public holidays and contract
+hours per day of a year.
+
+The table of a year is computed once and cached. Its lists are indexed by the
+day of the year (0 for January 1st), see index():
+
+    cal, i = workcal.index(date)
+    if cal['workday'][i]:
+        ...
+
+Standard library only (used by csv_check.py which does without numpy).
+"""
+
+import functools
+from datetime import date, timedelta
+
+
+#
+# config
+#
+
+CONTRACT_HOURS = 8  # per working day
+
+# fixed public holidays in Austria (month, day)
+HOLIDAYS = [
+    (1, 1),  # Neujahr
+    (1, 6),  # Heilige Drei Koenige
+    (5, 1),  # Staatsfeiertag
+    (8, 15),  # Mariae Himmelfahrt
+    (10, 26),  # Nationalfeiertag
+    (11, 1),  # Allerheiligen
+    (12, 8),  # Mariae Empfaengnis
+    (12, 25),  # Christtag
+    (12, 26),  # Stefanitag
+]
+# movable public holidays (days after Easter Sunday)
+EASTER_HOLIDAYS = [
+    1,  # Ostermontag
+    39,  # Christi Himmelfahrt
+    50,  # Pfingstmontag
+    60,  # Fronleichnam
+]
+
+
+#
+# table
+#
+
+def easter(year):
+    """Easter Sunday (Gregorian calendar, anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19*a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2*e + 2*i - h - k) % 7
+    m = (a + 11*h + 22*l) // 451
+    month, day = divmod(h + l - 7*m + 114, 31)
+    return date(year, month, day + 1)
+
+def holidays(year):
+    """Public holidays of a year (sorted dates)."""
+    res = [date(year, m, d) for m, d in HOLIDAYS]
+    res += [easter(year) + timedelta(days=d) for d in EASTER_HOLIDAYS]
+    return sorted(res)
+
+@functools.lru_cache(maxsize=None)
+def table(year, contract=CONTRACT_HOURS):
+    """Calendar of a year (dict of lists indexed by the day of the year).
+
+    Keys: 'date', 'weekday' (Monday to Friday), 'weekend', 'holiday',
+    'workday' (weekday but no holiday) and 'hours' (contract hours).
+
+    """
+    first = date(year, 1, 1)
+    n = (date(year + 1, 1, 1) - first).days
+    dates = [first + timedelta(days=i) for i in range(n)]
+    weekday = [d.weekday() < 5 for d in dates]
+    holiday = [False] * n
+    for d in holidays(year):
+        holiday[(d - first).days] = True
+    workday = [w and not h for w, h in zip(weekday, holiday)]
+    return {
+        'date': dates,
+        'weekday': weekday,
+        'weekend': [not w for w in weekday],
+        'holiday': holiday,
+        'workday': workday,
+        'hours': [contract if w else 0 for w in workday],
+    }
+
+def index(day, contract=CONTRACT_HOURS):
+    """Table of the year and index of a date (or datetime)."""
+    return table(day.year, contract), day.timetuple().tm_yday - 1
+
+def parse(s):
+    """Date of a timesheet's 'Date' column (e.g., '2018-01-15 Mon')."""
+    return date(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+
+def month_days(year, month):
+    """Dates of the days of a month (from the table of its year)."""
+    first = date(year, month, 1).timetuple().tm_yday - 1
+    n = ((date(year + month // 12, month % 12 + 1, 1)
+          - date(year, month, 1)).days)
+    return table(year)['date'][first:first + n]
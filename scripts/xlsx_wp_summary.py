@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
 import argparse
-import pandas as pd
+
+import instrument
 
 #
 # argument parsing
@@ -19,50 +20,63 @@ parser.add_argument('--header', type=str,
                     help="""Header in CSV format (delimiter ',') for the
                     summary output, e.g., "2,4.1" will print the summary for
                     WP2 and WP4 Task1. Separate WP from tasks with '.'.""")
-args = parser.parse_args()
+instrument.add_arguments(parser)
 
 
-#
-# pandas does everything :)
-#
+def main(argv=None):
+    args = parser.parse_args(argv)
+    stages = instrument.Stages(args)
+
+    #
+    # pandas does everything :)
+    #
+
+    with stages.stage('load') as s:
+        import pandas as pd
+        data = pd.read_excel(args.data, header=args.skip)
+        s['rows'] = len(data)
 
-data = pd.read_excel(args.data, header=args.skip)
+    with stages.stage('summary'):
+        # 31 days/rows
+        data = data.loc[0:30, ['WP', 'Task', 'Hours']]
+        # fill missing values (NaN) with zeros
+        data = data.fillna(value=0)
+        # remove zero hours lines
+        data = data[data.Hours > 0]
+        # convert WP and task to int
+        data[['WP', 'Task']] = data[['WP', 'Task']].astype(int)
 
-# 31 days/rows
-data = data.loc[0:30, ['WP', 'Task', 'Hours']]
-# fill missing values (NaN) with zeros
-data = data.fillna(value=0)
-# remove zero hours lines
-data = data[data.Hours > 0]
-# convert WP and task to int
-data[['WP', 'Task']] = data[['WP', 'Task']].astype(int)
+        #  wp and task w.r.t. given header
+        header = []
+        if args.header is not None:
+            cols = args.header.split(',')
+            for c in cols:
+                parts = c.split('.')
+                wp = 0
+                task = 0
+                try:
+                    wp = int(parts[0])
+                    task = int(parts[1])
+                except:
+                    pass
+                header.append((wp, task))
+                df = pd.DataFrame([[wp, task, 0]],
+                                  columns=list(data.columns))
+                data = data.append(df)
 
-#  wp and task w.r.t. given header
-header = []
-if args.header is not None:
-    cols = args.header.split(',')
-    for c in cols:
-        parts = c.split('.')
-        wp = 0
-        task = 0
-        try:
-            wp = int(parts[0])
-            task = int(parts[1])
-        except:
-            pass
-        header.append((wp, task))
-        df = pd.DataFrame([[wp, task, 0]], columns=list(data.columns))
-        data = data.append(df)
+        gb = data.groupby(['WP', 'Task'])
 
-gb = data.groupby(['WP', 'Task'])
+        if args.header is None:
+            # print generic summary (histogram)
+            print(gb.sum())
+        else:
+            # print summary according to header
+            hours = [data.loc[gb.groups[h], 'Hours'].sum() for h in header]
+            hours = [str(h) if h > 0 else "" for h in hours]
+            head = [str(wp) + '.' + str(task) for wp, task in header]
+            print('\t'.join(head))
+            print('\t'.join(hours))
+    stages.report()
 
-if args.header is None:
-    # print generic summary (histogram)
-    print(gb.sum())
-else:
-    # print summary according to header
-    hours = [data.loc[gb.groups[h], 'Hours'].sum() for h in header]
-    hours = [str(h) if h > 0 else "" for h in hours]
-    head = [str(wp) + '.' + str(task) for wp, task in header]
-    print('\t'.join(head))
-    print('\t'.join(hours))
+if __name__ == '__main__':
+    main()
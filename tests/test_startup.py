@@ -0,0 +1,55 @@
+"""Startup of the timesheet CLI: '-h' of a subcommand must not import the
+heavy dependencies (see timesheet.py).
+
+Run with 'python -m pytest tests' or 'python -m unittest discover tests'.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       os.pardir, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import timesheet
+
+HEAVY = ['numpy', 'pandas', 'matplotlib', 'pyarrow', 'openpyxl']
+
+# runs 'timesheet.py <args>' and prints the heavy modules imported
+PROBE = """
+import json, sys
+import timesheet
+try:
+    timesheet.main(sys.argv[1:])
+except SystemExit:
+    pass
+print(json.dumps([m for m in {heavy!r} if m in sys.modules]),
+      file=sys.stderr)
+"""
+
+
+def imported(args):
+    """Heavy modules imported by 'timesheet.py <args>' in a fresh process."""
+    res = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY)] + args,
+        cwd=SCRIPTS, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    return json.loads(res.stderr.strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_help(self):
+        self.assertEqual(imported(["-h"]), [])
+
+    def test_subcommand_help(self):
+        for command in timesheet.COMMANDS:
+            with self.subTest(command=command):
+                self.assertEqual(imported([command, "-h"]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()